@@ -0,0 +1,113 @@
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException, status
+from sqlalchemy import event, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.core.cache import TTLCache
+from app.core.config import settings
+
+# board_id -> (owner user_id, workspace_id) and workspace_id -> owner user_id.
+# Ownership never changes after creation, so only deletes need to invalidate.
+board_owners = TTLCache(max_size=settings.authz_cache_size, ttl_seconds=settings.authz_cache_ttl_seconds)
+workspace_owners = TTLCache(max_size=settings.authz_cache_size, ttl_seconds=settings.authz_cache_ttl_seconds)
+
+FOREIGN_KEY_VIOLATION = "23503"
+
+
+async def resolve_board_workspace(db: AsyncSession, board_id: int, user_id: int) -> int | None:
+    cached = board_owners.get(board_id)
+    if cached is None:
+        result = await db.execute(
+            select(models.Workspace.user_id, models.Board.workspace_id)
+            .join(models.Workspace, models.Board.workspace_id == models.Workspace.id)
+            .where(models.Board.id == board_id)
+        )
+        row = result.first()
+        if row is None:
+            return None
+        cached = (row.user_id, row.workspace_id)
+        board_owners.set(board_id, cached)
+        workspace_owners.set(row.workspace_id, row.user_id)
+
+    owner_id, workspace_id = cached
+    return workspace_id if owner_id == user_id else None
+
+
+async def require_board_workspace(db: AsyncSession, board_id: int, user_id: int) -> int:
+    workspace_id = await resolve_board_workspace(db, board_id, user_id)
+    if workspace_id is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Board not found")
+    return workspace_id
+
+
+async def require_board(db: AsyncSession, board_id: int, user_id: int) -> models.Board:
+    await require_board_workspace(db, board_id, user_id)
+    board = await db.get(models.Board, board_id)
+    if board is None:
+        # Deleted by another worker since the ownership fact was cached.
+        forget_board(board_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Board not found")
+    return board
+
+
+async def user_owns_workspace(db: AsyncSession, workspace_id: int, user_id: int) -> bool:
+    owner_id = workspace_owners.get(workspace_id)
+    if owner_id is None:
+        result = await db.execute(select(models.Workspace.user_id).where(models.Workspace.id == workspace_id))
+        owner_id = result.scalar_one_or_none()
+        if owner_id is None:
+            return False
+        workspace_owners.set(workspace_id, owner_id)
+    return owner_id == user_id
+
+
+async def require_workspace(db: AsyncSession, workspace_id: int, user_id: int) -> None:
+    if not await user_owns_workspace(db, workspace_id, user_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workspace not found")
+
+
+@asynccontextmanager
+async def _parent_must_exist(db: AsyncSession, forget: Callable[[], None], detail: str) -> AsyncIterator[None]:
+    # Another worker may have deleted the parent while this worker still has its owner cached; the
+    # foreign key then rejects the insert, and that is reported like any other missing parent.
+    try:
+        yield
+    except IntegrityError as exc:
+        if getattr(exc.orig, "sqlstate", None) != FOREIGN_KEY_VIOLATION:
+            raise
+        await db.rollback()
+        forget()
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=detail)
+
+
+def board_must_exist(db: AsyncSession, board_id: int):
+    # Wraps the flush of a row whose only foreign key is its board.
+    return _parent_must_exist(db, lambda: forget_board(board_id), "Board not found")
+
+
+def workspace_must_exist(db: AsyncSession, workspace_id: int):
+    # Wraps the flush of a row whose only foreign key is its workspace.
+    return _parent_must_exist(db, lambda: forget_workspace(workspace_id), "Workspace not found")
+
+
+def forget_board(board_id: int) -> None:
+    board_owners.discard(board_id)
+
+
+def forget_workspace(workspace_id: int) -> None:
+    workspace_owners.discard(workspace_id)
+    board_owners.discard_where(lambda _, owner: owner[1] == workspace_id)
+
+
+@event.listens_for(models.Board, "after_delete")
+def _forget_deleted_board(mapper, connection, target: models.Board) -> None:
+    forget_board(target.id)
+
+
+@event.listens_for(models.Workspace, "after_delete")
+def _forget_deleted_workspace(mapper, connection, target: models.Workspace) -> None:
+    forget_workspace(target.id)
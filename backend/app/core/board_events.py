@@ -0,0 +1,157 @@
+import asyncio
+import logging
+
+import asyncpg
+import orjson
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from app.core.config import settings
+from app.db.session import asyncpg_dsn
+
+logger = logging.getLogger("octopis.board_events")
+
+CHANNEL = "board_events"
+# NOTIFY payloads are capped at 8000 bytes; bigger batches go out without ids and clients reload the board.
+MAX_EVENT_TASK_IDS = 500
+PING = '{"event":"ping"}'
+# Sent when events may have been lost (listener reconnect, slow client); clients reload the board.
+RESYNC = '{"event":"resync"}'
+
+NOTIFY_SQL = text("SELECT pg_notify(:channel, :payload)")
+
+
+async def publish_board_event(
+    db: AsyncSession, board_id: int, event: str, task_ids: list[int], version: int | None = None
+) -> None:
+    # Runs in the writer's transaction: Postgres delivers the notification on commit and drops it on rollback.
+    message = {"event": event, "board_id": board_id, "version": version}
+    if len(task_ids) <= MAX_EVENT_TASK_IDS:
+        message["task_ids"] = task_ids
+    await db.execute(NOTIFY_SQL, {"channel": CHANNEL, "payload": orjson.dumps(message).decode("utf-8")})
+
+
+class Subscriber:
+    def __init__(self, board_id: int, max_pending: int):
+        self.board_id = board_id
+        self.queue: asyncio.Queue[str] = asyncio.Queue(max_pending)
+
+    def push(self, message: str) -> None:
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # A client that cannot keep up gets one resync instead of an unbounded backlog.
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+
+class BoardEventHub:
+    # One LISTEN connection per worker, outside the SQLAlchemy pool; notifications are fanned out
+    # in memory to the sockets subscribed to that board.
+    def __init__(self, *, dsn: str, max_pending: int, check_seconds: float):
+        self.dsn = dsn
+        self.max_pending = max_pending
+        self.check_seconds = check_seconds
+        self.running = False
+        self._subscribers: dict[int, set[Subscriber]] = {}
+        self._task: asyncio.Task | None = None
+
+    def subscribe(self, board_id: int) -> Subscriber:
+        subscriber = Subscriber(board_id, self.max_pending)
+        self._subscribers.setdefault(board_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        subscribers = self._subscribers.get(subscriber.board_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[subscriber.board_id]
+
+    async def start(self) -> None:
+        self.running = True
+        self._task = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        self.running = False
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def _on_notify(self, connection, pid: int, channel: str, payload: str) -> None:
+        # The payload is already the compact JSON clients receive; only the board id is read here.
+        try:
+            board_id = orjson.loads(payload)["board_id"]
+        except (orjson.JSONDecodeError, KeyError, TypeError):
+            logger.warning("Ignoring malformed board event %r", payload)
+            return
+        for subscriber in self._subscribers.get(board_id, ()):
+            subscriber.push(payload)
+
+    async def _listen(self) -> None:
+        connected_before = False
+        while True:
+            try:
+                connection = await asyncpg.connect(self.dsn, timeout=self.check_seconds)
+            except Exception:
+                logger.exception("Board event listener could not connect")
+                await asyncio.sleep(1)
+                continue
+            try:
+                await connection.add_listener(CHANNEL, self._on_notify)
+                if connected_before:
+                    for subscribers in self._subscribers.values():
+                        for subscriber in subscribers:
+                            subscriber.push(RESYNC)
+                connected_before = True
+                # A LISTEN connection is otherwise idle, so a dead one would go unnoticed without a probe.
+                while True:
+                    await asyncio.sleep(self.check_seconds)
+                    await connection.fetchval("SELECT 1", timeout=self.check_seconds)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Board event listener lost its connection")
+                await asyncio.sleep(1)
+            finally:
+                connection.terminate()
+
+
+async def stream_board_events(websocket: WebSocket, subscriber: Subscriber, ping_seconds: float) -> None:
+    async def forward() -> None:
+        while True:
+            try:
+                message = await asyncio.wait_for(subscriber.queue.get(), ping_seconds)
+            except TimeoutError:
+                # Keeps proxies from closing an idle socket.
+                message = PING
+            await websocket.send_text(message)
+
+    async def wait_for_disconnect() -> None:
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    tasks = {asyncio.create_task(forward()), asyncio.create_task(wait_for_disconnect())}
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            try:
+                task.result()
+            except WebSocketDisconnect:
+                pass
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+board_event_hub = BoardEventHub(
+    dsn=asyncpg_dsn(),
+    max_pending=settings.board_events_max_pending,
+    check_seconds=settings.board_events_check_seconds,
+)
@@ -1,19 +1,47 @@
-from fastapi import Depends, HTTPException, status
+from dataclasses import dataclass
+
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import event, select
 
-from app.db.session import get_session
+from app.db.replica import MIN_LSN_HEADER, read_after_lsn, replica_monitor, track_writes
+from app.db.session import ReplicaSessionLocal, get_session
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.metrics import read_sessions
 from app.core.security import decode_token
 from app import models
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_session),
-):
+@dataclass(frozen=True, slots=True)
+class CurrentUser:
+    id: int
+    email: str
+    username: str | None
+    is_active: bool
+
+
+user_cache = TTLCache(
+    max_size=settings.auth_user_cache_size if settings.auth_user_cache_enabled else 0,
+    ttl_seconds=settings.auth_user_cache_ttl_seconds,
+)
+
+
+def invalidate_cached_user(user_id: int) -> None:
+    user_cache.discard(user_id)
+
+
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _forget_changed_user(mapper, connection, target: models.User) -> None:
+    # Covers ORM writes (e.g. is_active = False); bulk UPDATE statements must call invalidate_cached_user.
+    invalidate_cached_user(target.id)
+
+
+async def get_token_user_id(token: str = Depends(oauth2_scheme)) -> int:
     payload = decode_token(token)
     if payload.get("type") != "access":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token type")
@@ -21,10 +49,49 @@ async def get_current_user(
     user_id = payload.get("sub")
     if not user_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token subject")
+    return int(user_id)
 
-    result = await db.execute(select(models.User).where(models.User.id == int(user_id)))
+
+async def load_current_user(db: AsyncSession, user_id: int) -> CurrentUser:
+    # A cache hit never touches the session, so no pooled connection is checked out for auth.
+    cached = user_cache.get(user_id)
+    if cached is not None:
+        return cached
+
+    result = await db.execute(select(models.User).where(models.User.id == user_id))
     user = result.scalar_one_or_none()
     if not user or not user.is_active:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found or inactive")
 
+    snapshot = CurrentUser(id=user.id, email=user.email, username=user.username, is_active=user.is_active)
+    user_cache.set(snapshot.id, snapshot)
+    return snapshot
+
+
+async def get_current_user(
+    user_id: int = Depends(get_token_user_id),
+    db: AsyncSession = Depends(get_session),
+) -> CurrentUser:
+    user = await load_current_user(db, user_id)
+    # The endpoint shares this session, so whatever it commits counts as this client's write.
+    track_writes(db)
     return user
+
+
+async def get_read_session(request: Request, db: AsyncSession = Depends(get_session)) -> AsyncSession:
+    # For read-only endpoints: the replica while it is healthy and has replayed the client's last write
+    # (X-Min-Lsn, see ReadYourWritesMiddleware). Otherwise the request's primary session.
+    if ReplicaSessionLocal is None or not replica_monitor.use_for(read_after_lsn(request.headers.get(MIN_LSN_HEADER))):
+        read_sessions.inc("primary")
+        yield db
+        return
+    read_sessions.inc("replica")
+    async with ReplicaSessionLocal() as session:
+        yield session
+
+
+async def get_current_user_read(
+    user_id: int = Depends(get_token_user_id),
+    db: AsyncSession = Depends(get_read_session),
+) -> CurrentUser:
+    return await load_current_user(db, user_id)
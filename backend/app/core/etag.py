@@ -0,0 +1,72 @@
+import hashlib
+
+from fastapi import HTTPException, Request, Response, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+
+# Conditional GETs revalidate on every use; the private cache keeps per-user responses out of proxies.
+CACHE_CONTROL = "private, no-cache"
+
+
+async def get_board_version(db: AsyncSession, board_id: int) -> int:
+    result = await db.execute(select(models.Board.version).where(models.Board.id == board_id))
+    version = result.scalar_one_or_none()
+    if version is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Board not found")
+    return version
+
+
+async def get_current_board_version(
+    db: AsyncSession, primary: AsyncSession, board_id: int, min_version: int | None
+) -> tuple[AsyncSession, int]:
+    # Board events go out when the primary commits, possibly before the replica has replayed the change.
+    # A refetch that names the version from the event reads from the primary while the replica is behind
+    # it, instead of returning the old rows under a tag the client would then revalidate against.
+    version = await get_board_version(db, board_id)
+    if min_version is not None and version < min_version and db is not primary:
+        return primary, await get_board_version(primary, board_id)
+    return db, version
+
+
+async def bump_board_version(db: AsyncSession, board_id: int) -> int | None:
+    # Runs in the writer's transaction, so the new version becomes visible together with the change.
+    result = await db.execute(
+        update(models.Board)
+        .where(models.Board.id == board_id)
+        .values(version=models.Board.version + 1)
+        .returning(models.Board.version)
+    )
+    return result.scalar_one_or_none()
+
+
+async def bump_workspace_board_versions(db: AsyncSession, workspace_id: int) -> None:
+    await db.execute(
+        update(models.Board).where(models.Board.workspace_id == workspace_id).values(version=models.Board.version + 1)
+    )
+
+
+def make_etag(*parts) -> str:
+    return '"' + "-".join(str(part) for part in parts) + '"'
+
+
+def query_fingerprint(request: Request) -> str:
+    # Filtered or paginated reads of one board must not share a validator with the full list.
+    # min_version only picks the database to read from, not what is returned.
+    query = "&".join(part for part in request.url.query.split("&") if not part.startswith("min_version="))
+    return hashlib.blake2b(query.encode("utf-8"), digest_size=6).hexdigest() if query else "all"
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored.
+    return etag in (candidate.strip().removeprefix("W/") for candidate in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
@@ -0,0 +1,100 @@
+import json
+from typing import Any
+
+from fastapi import HTTPException, status
+from sqlalchemy import Numeric, Text, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
+from sqlalchemy.sql.elements import BindParameter
+
+MAX_FILTER_CONDITIONS = 20
+RANGE_OPERATORS = {"$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+
+# Filter documents are JSON objects keyed by (optionally dotted) paths inside the record data:
+#   {"status": "done", "owner.name": "ann"}   equality, merged into a single @> containment
+#   {"tags": {"$contains": ["a"]}}             array/object containment
+#   {"status": {"$in": ["a", "b"]}}            any of several values
+#   {"amount": {"$gte": 10, "$lt": 100}}       numeric or string ranges
+# Equality, $contains and $in are answered by the jsonb_path_ops GIN index; ranges narrow that result.
+def compile_record_filter(raw: str | None, column: str = "data") -> tuple[str, list[BindParameter]]:
+    if not raw:
+        return "", []
+    try:
+        spec = json.loads(raw)
+    except ValueError:
+        _invalid("Filter must be a JSON object")
+    if not isinstance(spec, dict):
+        _invalid("Filter must be a JSON object")
+
+    contains: dict[str, Any] = {}
+    clauses: list[str] = []
+    binds: list[BindParameter] = []
+    conditions = 0
+
+    for key, condition in spec.items():
+        path = [part for part in key.split(".") if part]
+        if not path:
+            _invalid("Filter keys must not be empty")
+
+        operators = condition if isinstance(condition, dict) and condition and all(
+            name.startswith("$") for name in condition
+        ) else {"$eq": condition}
+
+        for operator, value in operators.items():
+            conditions += 1
+            if conditions > MAX_FILTER_CONDITIONS:
+                _invalid(f"At most {MAX_FILTER_CONDITIONS} conditions are allowed")
+            name = f"f{len(binds)}"
+
+            if operator in ("$eq", "$contains"):
+                _merge(contains, _nest(path, value))
+            elif operator == "$in":
+                if not isinstance(value, list) or not value:
+                    _invalid("$in expects a non-empty list")
+                options = []
+                for index, option in enumerate(value):
+                    option_name = f"{name}_{index}"
+                    binds.append(bindparam(option_name, _nest(path, option), type_=JSONB))
+                    options.append(f"{column} @> :{option_name}")
+                clauses.append("(" + " OR ".join(options) + ")")
+            elif operator in RANGE_OPERATORS:
+                if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+                    _invalid(f"{operator} expects a number or a string")
+                sql_operator = RANGE_OPERATORS[operator]
+                binds.append(bindparam(f"{name}_path", path, type_=ARRAY(Text)))
+                if isinstance(value, str):
+                    binds.append(bindparam(name, value, type_=Text))
+                    clauses.append(f"({column} #>> :{name}_path) {sql_operator} :{name}")
+                else:
+                    binds.append(bindparam(name, value, type_=Numeric))
+                    clauses.append(
+                        f"(CASE WHEN jsonb_typeof({column} #> :{name}_path) = 'number' "
+                        f"THEN ({column} #>> :{name}_path)::numeric END) {sql_operator} :{name}"
+                    )
+            else:
+                _invalid(f"Unsupported operator {operator}")
+
+    if contains:
+        binds.append(bindparam("f_contains", contains, type_=JSONB))
+        clauses.insert(0, f"{column} @> :f_contains")
+    return " AND ".join(clauses), binds
+
+
+def _nest(path: list[str], value: Any) -> dict[str, Any]:
+    for part in reversed(path):
+        value = {part: value}
+    return value
+
+
+def _merge(target: dict[str, Any], source: dict[str, Any]) -> None:
+    for key, value in source.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value)
+        elif key in target and target[key] != value:
+            _invalid(f"Conflicting conditions for key {key}")
+        else:
+            target[key] = value
+
+
+def _invalid(message: str):
+    raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=message)
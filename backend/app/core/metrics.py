@@ -0,0 +1,240 @@
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Seconds; spans a pool checkout that is instant up to one that hits the default pool_timeout.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STATEMENT_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100, 250)
+
+# Everything here is per process and only touched from the event loop thread: collectors are plain
+# counters and lists, no locks. Each worker exposes its own numbers and Prometheus sums them.
+
+
+class Histogram:
+    # Fixed buckets, Prometheus style: an observation lands in the first bucket whose upper bound
+    # it does not exceed.
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> dict:
+        cumulative = []
+        total = 0
+        for bound, count in zip((*self.buckets, float("inf")), self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return {"buckets": cumulative, "sum": self.sum, "count": self.count}
+
+
+class HistogramFamily:
+    def __init__(self, name: str, help_text: str, label_names: tuple[str, ...], buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self.children: dict[tuple, Histogram] = {}
+
+    def labels(self, *values) -> Histogram:
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = Histogram(self.buckets)
+        return child
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for values, child in sorted(self.children.items()):
+            lines.extend(render_histogram(self.name, child.snapshot(), dict(zip(self.label_names, values))))
+        return lines
+
+
+class CounterFamily:
+    def __init__(self, name: str, help_text: str, label_names: tuple[str, ...], kind: str = "counter"):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.kind = kind
+        self.values: dict[tuple, float] = {}
+
+    def inc(self, *values, amount: float = 1) -> None:
+        self.values[values] = self.values.get(values, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for values, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{format_labels(dict(zip(self.label_names, values)))} {format_value(value)}")
+        return lines
+
+
+def format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in labels.items()) + "}"
+
+
+def escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_histogram(name: str, snapshot: dict, labels: dict) -> list[str]:
+    lines = [
+        f"{name}_bucket{format_labels({**labels, 'le': format_value(bound)})} {count}"
+        for bound, count in snapshot["buckets"]
+    ]
+    lines.append(f"{name}_sum{format_labels(labels)} {format_value(snapshot['sum'])}")
+    lines.append(f"{name}_count{format_labels(labels)} {snapshot['count']}")
+    return lines
+
+
+http_requests = CounterFamily("http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+http_in_progress = CounterFamily(
+    "http_requests_in_progress", "HTTP requests currently being served.", ("method",), kind="gauge"
+)
+http_duration = HistogramFamily(
+    "http_request_duration_seconds", "Time from request start to the end of the response body.", ("method", "route")
+)
+request_db_duration = HistogramFamily(
+    "http_request_db_duration_seconds", "Time spent executing SQL per request.", ("method", "route")
+)
+request_db_statements = HistogramFamily(
+    "http_request_db_statements", "SQL statements executed per request.", ("method", "route"), STATEMENT_COUNT_BUCKETS
+)
+read_sessions = CounterFamily(
+    "db_read_sessions_total", "Read-only endpoint sessions by the database they were routed to.", ("engine",)
+)
+db_statement_duration = Histogram()
+
+
+class RequestDbStats:
+    __slots__ = ("statements", "seconds")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+
+
+request_db_stats: ContextVar[RequestDbStats | None] = ContextVar("request_db_stats", default=None)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    # The async engine runs these hooks in the calling task's context, so the ContextVar set by
+    # MetricsMiddleware attributes each statement to its request.
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = perf_counter() - context._metrics_started
+        db_statement_duration.observe(elapsed)
+        stats = request_db_stats.get()
+        if stats is not None:
+            stats.statements += 1
+            stats.seconds += elapsed
+
+
+class MetricsMiddleware:
+    # Pure ASGI, like RequestIdMiddleware. Routes are labelled by their path template (Starlette
+    # stores the matched route in the scope), so label cardinality stays bounded.
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        status_code = 500
+        stats = RequestDbStats()
+        token = request_db_stats.set(stats)
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_in_progress.inc(method)
+        started = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = perf_counter() - started
+            http_in_progress.inc(method, amount=-1)
+            request_db_stats.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", None) or "unmatched"
+            http_requests.inc(method, path, str(status_code))
+            http_duration.labels(method, path).observe(elapsed)
+            request_db_duration.labels(method, path).observe(stats.seconds)
+            request_db_statements.labels(method, path).observe(stats.statements)
+
+
+def render_metrics(*, pools: dict[str, dict], caches: dict, replicas: dict[str, dict] | None = None) -> str:
+    # pools maps an engine name to its pool_stats(); caches maps a name to a TTLCache; replicas maps
+    # an engine name to its ReplicaMonitor.stats().
+    lines = []
+    for family in (
+        http_requests,
+        http_in_progress,
+        http_duration,
+        request_db_duration,
+        request_db_statements,
+        read_sessions,
+    ):
+        lines.extend(family.render())
+    lines.append("# HELP db_statement_duration_seconds Time per SQL statement.")
+    lines.append("# TYPE db_statement_duration_seconds histogram")
+    lines.extend(render_histogram("db_statement_duration_seconds", db_statement_duration.snapshot(), {}))
+
+    gauges = (
+        ("size", "db_pool_size", "gauge", "Connections the pool keeps open."),
+        ("checked_out", "db_pool_checked_out", "gauge", "Connections in use."),
+        ("idle", "db_pool_idle", "gauge", "Open connections waiting in the pool."),
+        ("overflow", "db_pool_overflow", "gauge", "Connections open beyond the pool size."),
+        ("timeouts", "db_pool_checkout_timeouts_total", "counter", "Checkouts that gave up after pool_timeout."),
+    )
+    for key, metric, kind, help_text in gauges:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for name, stats in pools.items():
+            if key in stats:
+                lines.append(f"{metric}{format_labels({'engine': name})} {stats[key]}")
+    lines.append("# HELP db_pool_checkout_wait_seconds Time to get a connection from the pool.")
+    lines.append("# TYPE db_pool_checkout_wait_seconds histogram")
+    for name, stats in pools.items():
+        if "checkout_wait_seconds" in stats:
+            lines.extend(render_histogram("db_pool_checkout_wait_seconds", stats["checkout_wait_seconds"], {"engine": name}))
+
+    for key, metric, help_text in (
+        ("healthy", "db_replica_healthy", "1 while the replica is in read rotation."),
+        ("lag_seconds", "db_replica_lag_seconds", "Replay lag at the last health check."),
+    ):
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} gauge")
+        for name, stats in (replicas or {}).items():
+            if stats[key] is not None:
+                lines.append(f"{metric}{format_labels({'engine': name})} {format_value(stats[key])}")
+
+    for metric, attribute in (("cache_hits_total", "hits"), ("cache_misses_total", "misses")):
+        lines.append(f"# HELP {metric} In-process cache lookups.")
+        lines.append(f"# TYPE {metric} counter")
+        for name, cache in caches.items():
+            lines.append(f"{metric}{format_labels({'cache': name})} {getattr(cache, attribute)}")
+    return "\n".join(lines) + "\n"
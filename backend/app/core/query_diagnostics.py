@@ -0,0 +1,138 @@
+import logging
+import re
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.request_id import get_request_id
+
+logger = logging.getLogger("octopis.query_diagnostics")
+
+PLACEHOLDER_RE = re.compile(r"\$\d+")
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+LIST_RE = re.compile(r"\b(IN\s*)\(\s*\?(?:\s*,\s*\?)+\s*\)", re.IGNORECASE)
+ROWS_RE = re.compile(r"(\(\?[^()]*\))(?:\s*,\s*\(\?[^()]*\))+")
+SPACE_RE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    # Literal-stripped form of a statement, so the same query with different values (the N in N+1)
+    # collapses into one entry. Placeholders go first, before the number rule eats "$1".
+    statement = PLACEHOLDER_RE.sub("?", statement)
+    statement = STRING_RE.sub("?", statement)
+    statement = NUMBER_RE.sub("?", statement)
+    statement = LIST_RE.sub(r"\1(?, ...)", statement)
+    statement = ROWS_RE.sub(r"\1, ...", statement)
+    return SPACE_RE.sub(" ", statement).strip()
+
+
+class QueryLog:
+    def __init__(self):
+        self.queries: list[tuple[str, float]] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    @property
+    def seconds(self) -> float:
+        return sum(elapsed for _, elapsed in self.queries)
+
+    def fingerprints(self) -> Counter:
+        return Counter(fingerprint(statement) for statement, _ in self.queries)
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        return [(query, count) for query, count in self.fingerprints().most_common() if count >= threshold]
+
+    def format(self, width: int = 200) -> str:
+        return "\n".join(f"  {count}x {query[:width]}" for query, count in self.fingerprints().most_common())
+
+
+query_log: ContextVar[QueryLog | None] = ContextVar("query_log", default=None)
+
+
+def install_query_recorder(engine: AsyncEngine) -> None:
+    # Only a ContextVar lookup per statement unless a QueryLog is active (diagnostics mode or a test capture).
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if query_log.get() is not None:
+            context._diagnostics_started = perf_counter()
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        log = query_log.get()
+        started = getattr(context, "_diagnostics_started", None)
+        if log is not None and started is not None:
+            log.queries.append((statement, perf_counter() - started))
+
+
+@contextmanager
+def capture_queries() -> Iterator[QueryLog]:
+    log = QueryLog()
+    token = query_log.set(log)
+    try:
+        yield log
+    finally:
+        query_log.reset(token)
+
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[QueryLog]:
+    # For tests and benchmarks: fails with the fingerprinted query list when the block runs more statements.
+    with capture_queries() as log:
+        yield log
+    if log.count > limit:
+        raise AssertionError(f"{log.count} statements executed, expected at most {limit}:\n{log.format()}")
+
+
+class QueryDiagnosticsMiddleware:
+    # Opt-in (query_diagnostics_enabled). Records every statement of a request and logs the request
+    # when it crosses the statement count or DB time threshold, or repeats one query shape often
+    # enough to look like a per-item loop.
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        outer = query_log.get()
+        log = QueryLog()
+        token = query_log.set(log)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            query_log.reset(token)
+            if outer is not None:
+                outer.queries.extend(log.queries)
+            report_request(scope, log)
+
+
+def report_request(scope: Scope, log: QueryLog) -> None:
+    db_ms = log.seconds * 1000
+    repeated = log.repeated(settings.query_diagnostics_repeat_threshold)
+    if (
+        log.count <= settings.query_diagnostics_max_statements
+        and db_ms <= settings.query_diagnostics_max_db_ms
+        and not repeated
+    ):
+        return
+    route = getattr(scope.get("route"), "path", None) or scope["path"]
+    logger.warning(
+        "Query diagnostics: %s %s request_id=%s statements=%d db_ms=%.1f repeated=%d\n%s",
+        scope["method"],
+        route,
+        get_request_id(),
+        log.count,
+        db_ms,
+        len(repeated),
+        log.format(),
+    )
@@ -0,0 +1,146 @@
+from fastapi import HTTPException, status
+from sqlalchemy import Integer, String, bindparam, select, text, tuple_
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import models
+from app.core.etag import bump_board_version
+from app.db.session import SessionLocal
+
+# Rank keys are base-62 fractions compared bytewise (the column uses the "C" collation).
+# "" is the lowest key and is what tasks created without a placement get.
+DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+BASE = len(DIGITS)
+_DIGIT_INDEX = {digit: index for index, digit in enumerate(DIGITS)}
+
+
+class RankConflict(ValueError):
+    pass
+
+
+def rank_between(lower: str | None, upper: str | None) -> str:
+    lower = lower or ""
+    if upper is not None and upper <= lower:
+        raise RankConflict(f"No rank between {lower!r} and {upper!r}")
+    return _midpoint(lower, upper)
+
+
+def _midpoint(lower: str, upper: str | None) -> str:
+    if upper is not None:
+        prefix = 0
+        while prefix < len(upper) and (lower[prefix] if prefix < len(lower) else "0") == upper[prefix]:
+            prefix += 1
+        if prefix:
+            return upper[:prefix] + _midpoint(lower[prefix:], upper[prefix:])
+
+    low = _DIGIT_INDEX[lower[0]] if lower else 0
+    high = _DIGIT_INDEX[upper[0]] if upper is not None else BASE
+    if high - low > 1:
+        return DIGITS[(low + high) // 2]
+    if upper is not None and len(upper) > 1:
+        return upper[:1]
+    return DIGITS[low] + _midpoint(lower[1:], None)
+
+
+def spread_ranks(count: int) -> list[str]:
+    # Evenly spaced, shortest possible keys; used to rebalance a board.
+    width = 1
+    while BASE**width <= count:
+        width += 1
+    step = BASE**width // (count + 1)
+    return [_encode((index + 1) * step, width).rstrip("0") for index in range(count)]
+
+
+def _encode(value: int, width: int) -> str:
+    digits = []
+    for _ in range(width):
+        value, remainder = divmod(value, BASE)
+        digits.append(DIGITS[remainder])
+    return "".join(reversed(digits))
+
+
+REBALANCE_SQL = text(
+    """
+    UPDATE tasks AS t
+    SET rank = v.rank
+    FROM unnest(:ids, :ranks) AS v(id, rank)
+    WHERE t.id = v.id
+    """
+).bindparams(bindparam("ids", type_=ARRAY(Integer)), bindparam("ranks", type_=ARRAY(String)))
+
+
+async def rebalance_board_ranks(db: AsyncSession, board_id: int) -> None:
+    result = await db.execute(
+        select(models.Task.id)
+        .where(models.Task.board_id == board_id)
+        .order_by(models.Task.position, models.Task.rank, models.Task.id)
+        .with_for_update()
+    )
+    task_ids = list(result.scalars().all())
+    if task_ids:
+        await db.execute(REBALANCE_SQL, {"ids": task_ids, "ranks": spread_ranks(len(task_ids))})
+        await bump_board_version(db, board_id)
+
+
+async def rebalance_board_ranks_in_background(board_id: int) -> None:
+    async with SessionLocal() as db:
+        await rebalance_board_ranks(db, board_id)
+        await db.commit()
+
+
+async def adjacent_rank(
+    db: AsyncSession, board_id: int, neighbour, moving_task_id: int | None, *, above: bool
+) -> str | None:
+    # Rank of the task that sorts right next to `neighbour` at its position (above or below it), so a
+    # placement with one neighbour still lands between that neighbour and whatever already follows it.
+    key = tuple_(models.Task.rank, models.Task.id)
+    bound = tuple_(neighbour.rank, neighbour.id)
+    query = select(models.Task.rank).where(
+        models.Task.board_id == board_id,
+        models.Task.position == neighbour.position,
+        key > bound if above else key < bound,
+    )
+    if moving_task_id is not None:
+        query = query.where(models.Task.id != moving_task_id)
+    if above:
+        query = query.order_by(models.Task.rank, models.Task.id)
+    else:
+        query = query.order_by(models.Task.rank.desc(), models.Task.id.desc())
+    return (await db.execute(query.limit(1))).scalar_one_or_none()
+
+
+async def resolve_placement(
+    db: AsyncSession,
+    board_id: int,
+    after_task_id: int | None,
+    before_task_id: int | None,
+    moving_task_id: int | None = None,
+) -> tuple[int, str]:
+    # Returns (position, rank) that sorts right after `after_task_id` and before `before_task_id`.
+    # `moving_task_id` is the task being placed, if it already exists; its current key is ignored.
+    for attempt in range(2):
+        neighbour_ids = [task_id for task_id in (after_task_id, before_task_id) if task_id is not None]
+        result = await db.execute(
+            select(models.Task.id, models.Task.position, models.Task.rank).where(
+                models.Task.board_id == board_id, models.Task.id.in_(neighbour_ids)
+            )
+        )
+        neighbours = {row.id: row for row in result}
+        if any(task_id not in neighbours for task_id in neighbour_ids):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Neighbour task not found on this board")
+
+        after = neighbours.get(after_task_id)
+        before = neighbours.get(before_task_id)
+        try:
+            if after is not None and (before is None or before.position != after.position):
+                upper = await adjacent_rank(db, board_id, after, moving_task_id, above=True)
+                return after.position, rank_between(after.rank, upper)
+            if after is None:
+                lower = await adjacent_rank(db, board_id, before, moving_task_id, above=False)
+                return before.position, rank_between(lower, before.rank)
+            return after.position, rank_between(after.rank, before.rank)
+        except RankConflict:
+            # Neighbours share a key (e.g. rows created before ranking existed): spread the board once.
+            if attempt:
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Neighbour tasks are out of order")
+            await rebalance_board_ranks(db, board_id)
@@ -1,60 +1,333 @@
 import asyncio
-from collections import defaultdict, deque
-from time import monotonic
+import hashlib
+import logging
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from multiprocessing import resource_tracker, shared_memory
+from time import sleep, time
 
-from fastapi import Request, status
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import status
+from sqlalchemy import Float, LargeBinary, bindparam, text
+from sqlalchemy.dialects.postgresql import ARRAY
+from starlette.types import ASGIApp, Receive, Scope, Send
 
+from app.core.config import settings
 from app.core.errors import error_response
+from app.core.request_id import get_request_id
+from app.db.session import engine
 
+logger = logging.getLogger("octopis.rate_limit")
 
-class AuthRateLimitMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, *, max_requests: int, window_seconds: int):
-        super().__init__(app)
-        self.max_requests = max_requests
-        self.window_seconds = window_seconds
-        self._events: dict[str, deque[float]] = defaultdict(deque)
-        self._lock = asyncio.Lock()
-
-    async def dispatch(self, request: Request, call_next):
-        if not request.url.path.startswith("/auth/"):
-            return await call_next(request)
-
-        client_id = _extract_client_id(request)
-        key = f"{client_id}:{request.url.path}"
-        now = monotonic()
-        retry_after = 0
-
-        async with self._lock:
-            bucket = self._events[key]
-            threshold = now - self.window_seconds
-            while bucket and bucket[0] <= threshold:
-                bucket.popleft()
-
-            if len(bucket) >= self.max_requests:
-                retry_after = max(1, int(self.window_seconds - (now - bucket[0])))
+
+def gcra(tat: float | None, now: float, interval: float, tolerance: float) -> tuple[float, float]:
+    # Generic cell rate algorithm: a key is described by one float, its theoretical arrival time (TAT).
+    # A request is allowed while TAT - now <= window - interval, which admits bursts of max_requests
+    # and then one request per interval. Returns (new TAT, 0) when allowed, (old TAT, wait) otherwise.
+    if tat is None or tat < now:
+        tat = now
+    allowed_at = tat - tolerance
+    if allowed_at > now:
+        return tat, allowed_at - now
+    return tat + interval, 0.0
+
+
+class RateLimiter(ABC):
+    def __init__(self, *, max_requests: int, window_seconds: float):
+        self.interval = window_seconds / max_requests
+        self.tolerance = window_seconds - self.interval
+
+    @abstractmethod
+    def hit(self, key: bytes, now: float) -> float:
+        # Returns 0 when the request is allowed, otherwise the seconds until it would be.
+        # Must not block: it runs inline on the event loop for every auth request.
+        ...
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+
+class GcraLimiter(RateLimiter):
+    # Per-process state; checks never await, so no lock is needed on the event loop.
+    def __init__(self, *, max_requests: int, window_seconds: float, max_keys: int):
+        super().__init__(max_requests=max_requests, window_seconds=window_seconds)
+        self.max_keys = max_keys
+        self._tats: OrderedDict[bytes, float] = OrderedDict()
+        self.evictions = 0
+
+    def hit(self, key: bytes, now: float) -> float:
+        tat = self._tats.get(key)
+        if tat is not None:
+            self._tats.move_to_end(key)
+        tat, wait = gcra(tat, now, self.interval, self.tolerance)
+        if wait:
+            return wait
+        if key not in self._tats:
+            self._make_room(now)
+        self._tats[key] = tat
+        return 0.0
+
+    def merge(self, key: bytes, tat: float, now: float) -> None:
+        # Adopt a TAT observed elsewhere (another worker or host) when it is further ahead.
+        current = self._tats.get(key)
+        if current is None:
+            self._make_room(now)
+        if current is None or tat > current:
+            self._tats[key] = tat
+
+    def _make_room(self, now: float) -> None:
+        # Least recently used keys sit at the front. A key whose TAT has passed is idle and equal
+        # to a fresh one, so dropping it loses nothing; past the hard cap the oldest key goes anyway.
+        while self._tats:
+            key, tat = next(iter(self._tats.items()))
+            if tat >= now and len(self._tats) < self.max_keys:
+                return
+            del self._tats[key]
+            if tat >= now:
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self._tats)
+
+
+class SharedMemoryLimiter(RateLimiter):
+    # Workers on one host share a fixed table of (fingerprint, TAT) slots in a named shared memory
+    # segment. Slots are addressed by key hash with no probing and updates are unlocked, so it is
+    # approximate: two active keys in one slot share a budget, and racing writes from two workers can
+    # let one extra request through. The first slot is a header (magic, slot count) that lets a worker
+    # tell a usable segment from a half-created one or one left behind with a different size.
+    SLOT_SIZE = 16
+    MAGIC = int.from_bytes(b"OCTRL001", "little")
+    OPEN_ATTEMPTS = 50
+
+    def __init__(self, *, max_requests: int, window_seconds: float, slots: int, name: str):
+        super().__init__(max_requests=max_requests, window_seconds=window_seconds)
+        self.slots = slots
+        self._shm, self.owner = self._open(name)
+        self._fingerprints = self._shm.buf.cast("Q")
+        self._tats = self._shm.buf.cast("d")
+
+    def _open(self, name: str) -> tuple[shared_memory.SharedMemory, bool]:
+        size = (self.slots + 1) * self.SLOT_SIZE
+        for _ in range(self.OPEN_ATTEMPTS):
+            try:
+                shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            except FileExistsError:
+                pass
             else:
-                bucket.append(now)
+                # The segment belongs to the host, not to this worker: keep the resource tracker from
+                # unlinking it when the worker exits. stop() unlinks it explicitly.
+                resource_tracker.unregister(shm._name, "shared_memory")
+                header = shm.buf.cast("Q")
+                header[1] = self.slots
+                header[0] = self.MAGIC
+                header.release()
+                return shm, True
+            try:
+                shm = shared_memory.SharedMemory(name=name)
+            except (FileNotFoundError, ValueError):
+                # Unlinked by its owner after our create attempt, or created but not sized yet.
+                sleep(0.01)
+                continue
+            resource_tracker.unregister(shm._name, "shared_memory")
+            if shm.size >= self.SLOT_SIZE:
+                header = shm.buf.cast("Q")
+                magic, slots = header[0], header[1]
+                header.release()
+                if magic == self.MAGIC:
+                    if slots != self.slots or shm.size < size:
+                        shm.close()
+                        raise RuntimeError(
+                            f"Shared memory segment {name!r} holds {slots} rate limit slots, "
+                            f"{self.slots} configured; stop all workers or remove /dev/shm/{name}"
+                        )
+                    return shm, False
+            # The creator has not written the header yet.
+            shm.close()
+            sleep(0.01)
+        raise RuntimeError(f"Shared memory segment {name!r} is not a rate limit table; remove /dev/shm/{name}")
+
+    def hit(self, key: bytes, now: float) -> float:
+        fingerprint = int.from_bytes(key[:8], "little") | 1
+        index = (int.from_bytes(key[8:], "little") % self.slots + 1) * 2
+        tat = self._tats[index + 1]
+        if self._fingerprints[index] != fingerprint and tat < now:
+            tat = None
+        tat, wait = gcra(tat, now, self.interval, self.tolerance)
+        if wait:
+            return wait
+        self._fingerprints[index] = fingerprint
+        self._tats[index + 1] = tat
+        return 0.0
+
+    async def stop(self) -> None:
+        self._fingerprints.release()
+        self._tats.release()
+        self._shm.close()
+        if self.owner:
+            # Workers still attached keep their mapping; the next worker to start creates a fresh table.
+            # unlink() also unregisters from the resource tracker, which was told to forget it on create.
+            resource_tracker.register(self._shm._name, "shared_memory")
+            self._shm.unlink()
+
 
-        if retry_after > 0:
-            request_id = getattr(request.state, "request_id", None)
-            return error_response(
+SYNC_SQL = text(
+    """
+    INSERT INTO rate_limit_buckets AS b (key, tat, updated_at)
+    SELECT v.key, :now + v.spent, :now FROM unnest(:keys, :spent) AS v(key, spent)
+    ON CONFLICT (key) DO UPDATE SET tat = GREATEST(b.tat, :now) + EXCLUDED.tat - :now, updated_at = :now
+    RETURNING b.key, b.tat
+    """
+).bindparams(bindparam("keys", type_=ARRAY(LargeBinary)), bindparam("spent", type_=ARRAY(Float)))
+
+PULL_SQL = text(
+    """
+    SELECT key, tat FROM rate_limit_buckets
+    WHERE updated_at >= :since AND tat > :now
+    ORDER BY updated_at DESC
+    LIMIT :limit
+    """
+)
+
+PRUNE_SQL = text(
+    """
+    DELETE FROM rate_limit_buckets
+    WHERE key IN (
+        SELECT key FROM rate_limit_buckets WHERE tat < :now LIMIT 1000 FOR UPDATE SKIP LOCKED
+    )
+    """
+)
+
+
+class PostgresLimiter(RateLimiter):
+    # Decisions are made against a local GCRA table, so a request never waits on the database.
+    # Every sync interval the emission time spent locally is added to a shared UNLOGGED table in one
+    # statement, and TATs other hosts changed since the last sync are pulled in, so all hosts
+    # converge within one interval.
+    def __init__(self, *, max_requests: int, window_seconds: float, max_keys: int, sync_seconds: float):
+        super().__init__(max_requests=max_requests, window_seconds=window_seconds)
+        self.local = GcraLimiter(max_requests=max_requests, window_seconds=window_seconds, max_keys=max_keys)
+        self.window_seconds = window_seconds
+        self.sync_seconds = sync_seconds
+        self._spent: dict[bytes, float] = {}
+        self._synced_at = 0.0
+        self._pruned_at = 0.0
+        self._task: asyncio.Task | None = None
+
+    def hit(self, key: bytes, now: float) -> float:
+        wait = self.local.hit(key, now)
+        if not wait:
+            self._spent[key] = self._spent.get(key, 0.0) + self.interval
+        return wait
+
+    async def start(self) -> None:
+        self._task = asyncio.create_task(self._sync_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        try:
+            await self.sync()
+        except Exception:
+            logger.exception("Final rate limit sync failed")
+
+    async def sync(self) -> None:
+        spent, self._spent = self._spent, {}
+        now = time()
+        # Overlap with the previous pull so rows committed while it ran are not missed.
+        since = self._synced_at - self.sync_seconds
+        async with engine.begin() as connection:
+            if spent:
+                result = await connection.execute(
+                    SYNC_SQL, {"now": now, "keys": list(spent), "spent": list(spent.values())}
+                )
+                for key, tat in result:
+                    self.local.merge(bytes(key), tat, now)
+            result = await connection.execute(PULL_SQL, {"since": since, "now": now, "limit": self.local.max_keys})
+            for key, tat in result:
+                self.local.merge(bytes(key), tat, now)
+            if now - self._pruned_at >= self.window_seconds:
+                await connection.execute(PRUNE_SQL, {"now": now})
+                self._pruned_at = now
+        self._synced_at = now
+
+    async def _sync_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_seconds)
+            try:
+                await self.sync()
+            except Exception:
+                logger.exception("Rate limit sync failed")
+
+
+def build_rate_limiter() -> RateLimiter:
+    common = {
+        "max_requests": settings.auth_rate_limit_requests,
+        "window_seconds": settings.auth_rate_limit_window_seconds,
+    }
+    backend = settings.auth_rate_limit_backend
+    if backend == "memory":
+        return GcraLimiter(**common, max_keys=settings.auth_rate_limit_max_keys)
+    if backend == "shared_memory":
+        return SharedMemoryLimiter(
+            **common, slots=settings.auth_rate_limit_max_keys, name=settings.auth_rate_limit_shm_name
+        )
+    if backend == "postgres":
+        return PostgresLimiter(
+            **common,
+            max_keys=settings.auth_rate_limit_max_keys,
+            sync_seconds=settings.auth_rate_limit_sync_seconds,
+        )
+    raise ValueError(f"Unknown rate limit backend {backend!r}")
+
+
+class AuthRateLimitMiddleware:
+    # Pure ASGI: requests outside /auth/ are handed straight to the app without building a Request.
+    def __init__(self, app: ASGIApp, *, limiter: RateLimiter):
+        self.app = app
+        self.limiter = limiter
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith("/auth/"):
+            return await self.app(scope, receive, send)
+
+        key = rate_limit_key(_extract_client_id(scope), scope["path"])
+        # Wall-clock time: shared backends compare TATs written by other processes and hosts.
+        wait = self.limiter.hit(key, time())
+
+        if wait > 0:
+            retry_after = max(1, int(wait + 0.999))
+            response = error_response(
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
                 message="Too many auth requests. Please retry later.",
                 details={"retry_after_seconds": retry_after},
-                request_id=request_id,
+                request_id=get_request_id(),
                 headers={"Retry-After": str(retry_after)},
             )
+            return await response(scope, receive, send)
+
+        return await self.app(scope, receive, send)
+
 
-        return await call_next(request)
+def rate_limit_key(client_id: str, path: str) -> bytes:
+    # Fixed 16 bytes per key, however long the (client supplied) forwarded address is.
+    return hashlib.blake2b(f"{client_id}:{path}".encode("utf-8"), digest_size=16).digest()
 
 
-def _extract_client_id(request: Request) -> str:
-    forwarded_for = request.headers.get("x-forwarded-for")
-    if forwarded_for:
-        first = forwarded_for.split(",")[0].strip()
-        if first:
-            return first
-    if request.client and request.client.host:
-        return request.client.host
+def _extract_client_id(scope: Scope) -> str:
+    for name, value in scope["headers"]:
+        if name == b"x-forwarded-for":
+            first = value.decode("latin-1").split(",")[0].strip()
+            if first:
+                return first
+            break
+    client = scope.get("client")
+    if client and client[0]:
+        return client[0]
     return "unknown"
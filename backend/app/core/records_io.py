@@ -0,0 +1,149 @@
+import codecs
+import csv
+import io
+import json
+from collections.abc import AsyncIterator, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.sql.elements import BindParameter
+
+from app.db.session import engine
+
+EXPORT_BATCH_SIZE = 2000
+IMPORT_BATCH_SIZE = 5000
+MAX_IMPORT_BATCH_SIZE = 50000
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+CSV_COLUMNS = ("id", "data", "created_at")
+
+
+async def stream_records(
+    table: str,
+    fmt: str,
+    where: str = "",
+    binds: Sequence[BindParameter] = (),
+) -> AsyncIterator[bytes]:
+    # Runs on its own connection: the request session is gone by the time the body is sent.
+    # Rows are rendered to text by Postgres and pulled through a server-side cursor,
+    # so memory stays at one batch no matter how large the table is.
+    where = f"WHERE {where}" if where else ""
+    if fmt == "csv":
+        query = text(f"SELECT id, data::text, created_at FROM {table} {where} ORDER BY id")
+    else:
+        query = text(
+            f"SELECT jsonb_build_object('id', id, 'data', data, 'created_at', created_at)::text "
+            f"FROM {table} {where} ORDER BY id"
+        )
+    query = query.bindparams(*binds)
+
+    async with engine.connect() as connection:
+        result = await connection.stream(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        if fmt == "csv":
+            yield (",".join(CSV_COLUMNS) + "\r\n").encode("utf-8")
+        async for rows in result.partitions():
+            if fmt == "csv":
+                yield _encode_csv(rows)
+            else:
+                yield ("\n".join(row[0] for row in rows) + "\n").encode("utf-8")
+
+
+def _encode_csv(rows) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows((row[0], row[1], row[2].isoformat() if row[2] else "") for row in rows)
+    return buffer.getvalue().encode("utf-8")
+
+
+class RecordImportError(ValueError):
+    def __init__(self, line: int, message: str):
+        super().__init__(message)
+        self.line = line
+        self.message = message
+
+
+def _reject_constant(name: str):
+    # Python's json accepts NaN and Infinity, jsonb does not: they would only fail inside COPY.
+    raise ValueError(f"{name} is not valid JSON")
+
+
+async def iter_import_rows(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[tuple[int, str]]:
+    # Yields (line number, JSON text of the record data) as soon as each row is complete.
+    lines = _iter_lines(chunks)
+    if fmt == "csv":
+        async for item in _parse_csv(lines):
+            yield item
+    else:
+        async for item in _parse_ndjson(lines):
+            yield item
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        try:
+            pending += decoder.decode(chunk)
+        except UnicodeDecodeError:
+            raise RecordImportError(0, "Upload is not valid UTF-8")
+        *complete, pending = pending.split("\n")
+        for line in complete:
+            yield line + "\n"
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def _parse_ndjson(lines: AsyncIterator[str]) -> AsyncIterator[tuple[int, str]]:
+    line_no = 0
+    async for line in lines:
+        line_no += 1
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            value = json.loads(line, parse_constant=_reject_constant)
+        except ValueError:
+            raise RecordImportError(line_no, "Invalid JSON")
+        if not isinstance(value, dict):
+            raise RecordImportError(line_no, "Each line must be a JSON object")
+        # Only the exact export envelope is unwrapped to its data payload; any other object is the record itself.
+        if set(value) == set(CSV_COLUMNS) and isinstance(value["data"], dict):
+            yield line_no, json.dumps(value["data"])
+        else:
+            yield line_no, line
+
+
+async def _parse_csv(lines: AsyncIterator[str]) -> AsyncIterator[tuple[int, str]]:
+    header = None
+    line_no = 0
+    record = ""
+    async for line in lines:
+        line_no += 1
+        record += line
+        # A quoted field may span several physical lines; wait until quotes are balanced.
+        if record.count('"') % 2:
+            continue
+        text_record, record = record, ""
+        if not text_record.strip():
+            continue
+        row = next(csv.reader([text_record]))
+        if header is None:
+            header = row
+            continue
+        if len(row) != len(header):
+            raise RecordImportError(line_no, "Column count does not match header")
+        values = dict(zip(header, row))
+        if set(header) == set(CSV_COLUMNS):
+            try:
+                data = json.loads(values["data"], parse_constant=_reject_constant)
+            except ValueError:
+                raise RecordImportError(line_no, "Invalid JSON in data column")
+            if not isinstance(data, dict):
+                raise RecordImportError(line_no, "data column must be a JSON object")
+            yield line_no, json.dumps(data)
+        else:
+            yield line_no, json.dumps(values)
+    if record.strip():
+        raise RecordImportError(line_no, "Unterminated quoted field")
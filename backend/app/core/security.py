@@ -1,15 +1,31 @@
+import asyncio
+import hashlib
+import hmac
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Optional, TypeVar
+from uuid import uuid4
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
 
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes made with a different cost are flagged by verify_and_update and rewritten on the next login.
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.password_bcrypt_rounds)
 
 ALGORITHM = "HS256"
 
+T = TypeVar("T")
+
+# bcrypt releases the GIL, so a small thread pool keeps the event loop free without process overhead.
+password_executor = (
+    ThreadPoolExecutor(max_workers=settings.password_hash_workers, thread_name_prefix="password-hash")
+    if settings.password_hash_workers > 0
+    else None
+)
+_pending_password_jobs = 0
+
 
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
@@ -19,18 +35,64 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+async def run_password_job(func: Callable[..., T], *args) -> T:
+    global _pending_password_jobs
+    if password_executor is None:
+        return func(*args)
+    # Shed load instead of queueing logins that would time out anyway.
+    if _pending_password_jobs >= settings.password_hash_max_pending:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Authentication is busy, retry shortly",
+            headers={"Retry-After": "1"},
+        )
+    _pending_password_jobs += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(password_executor, func, *args)
+    finally:
+        _pending_password_jobs -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await run_password_job(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    # Returns (valid, new hash or None when the stored hash is already current).
+    return await run_password_job(pwd_context.verify_and_update, plain_password, hashed_password)
+
+
 def create_access_token(subject: str, expires_minutes: Optional[int] = None) -> str:
     expire = datetime.utcnow() + timedelta(minutes=expires_minutes or settings.access_token_expires_minutes)
     to_encode = {"sub": subject, "exp": expire, "type": "access"}
     return jwt.encode(to_encode, settings.secret_key, algorithm=ALGORITHM)
 
 
-def create_refresh_token(subject: str, expires_days: Optional[int] = None) -> str:
-    expire = datetime.utcnow() + timedelta(days=expires_days or settings.refresh_token_expires_days)
-    to_encode = {"sub": subject, "exp": expire, "type": "refresh"}
+def create_refresh_token(
+    subject: str,
+    expires_days: Optional[int] = None,
+    *,
+    issued_at: Optional[datetime] = None,
+    jti: Optional[str] = None,
+) -> str:
+    issued_at = issued_at or datetime.utcnow()
+    expire = issued_at + timedelta(days=expires_days or settings.refresh_token_expires_days)
+    # jti keeps tokens issued to the same user within one second distinct.
+    to_encode = {"sub": subject, "exp": expire, "type": "refresh", "jti": jti or uuid4().hex}
     return jwt.encode(to_encode, settings.secret_key, algorithm=ALGORITHM)
 
 
+def successor_jti(token_hash: str) -> str:
+    # The token a refresh token is rotated into is derived from it, so the same successor can be
+    # rebuilt later from the stored digest and rotation time without keeping any token in the clear.
+    return hmac.new(settings.secret_key.encode("utf-8"), token_hash.encode("ascii"), hashlib.sha256).hexdigest()[:32]
+
+
+def hash_token(token: str) -> str:
+    # Refresh tokens are stored and looked up by digest only.
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
 def decode_token(token: str) -> dict:
     try:
         return jwt.decode(token, settings.secret_key, algorithms=[ALGORITHM])
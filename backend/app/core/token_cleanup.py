@@ -0,0 +1,51 @@
+import asyncio
+import logging
+from datetime import datetime
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.session import SessionLocal
+
+logger = logging.getLogger("octopis.token_cleanup")
+
+# Small chunks keep each transaction short; SKIP LOCKED lets several workers prune side by side
+# without waiting on each other or on a refresh that is rotating one of the rows.
+PRUNE_SQL = text(
+    """
+    DELETE FROM refresh_tokens
+    WHERE id IN (
+        SELECT id FROM refresh_tokens
+        WHERE expires_at < :now
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    """
+)
+
+
+async def prune_expired_refresh_tokens(batch_size: int | None = None) -> int:
+    # Revoked tokens are kept until they expire so that reuse can still be detected.
+    batch_size = batch_size or settings.refresh_token_prune_batch_size
+    deleted = 0
+    while True:
+        async with SessionLocal() as db:
+            result = await db.execute(PRUNE_SQL, {"now": datetime.utcnow(), "batch_size": batch_size})
+            await db.commit()
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            return deleted
+        await asyncio.sleep(settings.refresh_token_prune_pause_seconds)
+
+
+async def run_refresh_token_pruner() -> None:
+    while True:
+        try:
+            deleted = await prune_expired_refresh_tokens()
+            if deleted:
+                logger.info("Pruned %s expired refresh tokens", deleted)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Refresh token pruning failed")
+        await asyncio.sleep(settings.refresh_token_prune_interval_seconds)
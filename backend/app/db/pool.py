@@ -0,0 +1,41 @@
+from time import perf_counter
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.metrics import Histogram
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    # Times every checkout, including the wait for a free slot once size + overflow are all in use,
+    # and counts the ones that give up after pool_timeout. Counters start over when the engine is
+    # disposed, since dispose() replaces the pool.
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_wait = Histogram()
+        self.timeouts = 0
+
+    def connect(self):
+        started = perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.checkout_wait.observe(perf_counter() - started)
+
+
+def pool_stats(pool) -> dict:
+    stats = {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "idle": pool.checkedin(),
+        # QueuePool counts overflow from -size, so it is negative until the pool is full.
+        "overflow": max(0, pool.overflow()),
+        "max_overflow": pool._max_overflow,
+    }
+    if isinstance(pool, InstrumentedPool):
+        stats["timeouts"] = pool.timeouts
+        stats["checkout_wait_seconds"] = pool.checkout_wait.snapshot()
+    return stats
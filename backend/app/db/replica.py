@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import math
+from collections import deque
+from contextvars import ContextVar
+from time import monotonic
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.orm import Session
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.db.session import engine, replica_engine
+
+logger = logging.getLogger("octopis.replica")
+
+WRITER_KEY = "tracks_writes"
+WRITE_LSN_HEADER = "x-write-lsn"
+MIN_LSN_HEADER = "x-min-lsn"
+
+PRIMARY_LSN_SQL = text("SELECT pg_current_wal_lsn() - '0/0'::pg_lsn")
+# NULL on a server that is not in recovery, e.g. a stand-in copy of the database used for local testing.
+REPLAY_LSN_SQL = text("SELECT CASE WHEN pg_is_in_recovery() THEN pg_last_wal_replay_lsn() - '0/0'::pg_lsn END")
+MAX_LSN_SAMPLES = 1000
+
+
+class RequestWrites:
+    __slots__ = ("committed",)
+
+    def __init__(self):
+        self.committed = False
+
+
+request_writes: ContextVar[RequestWrites | None] = ContextVar("request_writes", default=None)
+
+
+def track_writes(db: AsyncSession) -> None:
+    # Commits on this session count as the client's writes: the response tells it where to read from.
+    db.info[WRITER_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _remember_write(session: Session) -> None:
+    writes = request_writes.get()
+    if writes is not None and session.info.get(WRITER_KEY):
+        writes.committed = True
+
+
+def read_after_lsn(value: str | None) -> float | None:
+    # The WAL position a client wants its reads to include; anything unparsable keeps it on the primary.
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return math.inf
+
+
+class ReplicaMonitor:
+    # Takes the replica out of rotation while it is unreachable or more than max_lag_seconds behind;
+    # reads go to the primary until the first check passes. Lag is measured against the primary's WAL
+    # position sampled at every check: it is the age of the oldest sample the replica has not replayed
+    # yet. pg_last_xact_replay_timestamp() would report the whole idle time before the first write
+    # after a quiet period as lag.
+    def __init__(
+        self, primary: AsyncEngine, replica: AsyncEngine | None, *, max_lag_seconds: float, check_seconds: float
+    ):
+        self.primary = primary
+        self.engine = replica
+        self.max_lag_seconds = max_lag_seconds
+        self.check_seconds = check_seconds
+        self.healthy = False
+        self.lag_seconds: float | None = None
+        self.replayed_lsn: float = 0
+        self._samples: deque[tuple[float, int]] = deque(maxlen=MAX_LSN_SAMPLES)
+        self._task: asyncio.Task | None = None
+
+    def use_for(self, min_lsn: float | None) -> bool:
+        # replayed_lsn is as old as the last check, so a client that just wrote reads from the primary
+        # for up to check_seconds after the replica has caught up.
+        return self.healthy and (min_lsn is None or self.replayed_lsn >= min_lsn)
+
+    async def start(self) -> None:
+        if self.engine is None:
+            return
+        await self.check()
+        if not self.healthy:
+            logger.warning("Replica not in rotation at startup, lag %s", self.lag_seconds)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.healthy = False
+
+    async def check(self) -> None:
+        try:
+            self.lag_seconds = await asyncio.wait_for(self._measure_lag(), self.check_seconds)
+            healthy = self.lag_seconds <= self.max_lag_seconds
+        except Exception as exc:
+            self.lag_seconds = None
+            healthy = False
+            if self.healthy:
+                logger.warning("Replica check failed: %r", exc)
+        if healthy != self.healthy:
+            if healthy:
+                logger.info("Replica in rotation, lag %.1fs", self.lag_seconds)
+            else:
+                logger.warning("Replica out of rotation, lag %s", self.lag_seconds)
+        self.healthy = healthy
+
+    async def primary_lsn(self) -> int:
+        async with self.primary.connect() as connection:
+            return int((await connection.execute(PRIMARY_LSN_SQL)).scalar_one())
+
+    async def _measure_lag(self) -> float:
+        self._samples.append((monotonic(), await self.primary_lsn()))
+        async with self.engine.connect() as connection:
+            replayed = (await connection.execute(REPLAY_LSN_SQL)).scalar_one()
+        if replayed is None:
+            self.replayed_lsn = math.inf
+            return 0.0
+        self.replayed_lsn = int(replayed)
+        while self._samples and self._samples[0][1] <= replayed:
+            self._samples.popleft()
+        return monotonic() - self._samples[0][0] if self._samples else 0.0
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.check_seconds)
+            await self.check()
+
+    def stats(self) -> dict:
+        return {"healthy": int(self.healthy), "lag_seconds": self.lag_seconds}
+
+
+replica_monitor = ReplicaMonitor(
+    engine,
+    replica_engine,
+    max_lag_seconds=settings.replica_max_lag_seconds,
+    check_seconds=settings.replica_check_seconds,
+)
+
+
+class ReadYourWritesMiddleware:
+    # After a request that committed a write, the response carries the primary's WAL position. The
+    # client sends the latest one back as X-Min-Lsn, and get_read_session only uses the replica once it
+    # has replayed that far. The marker lives with the client, so it holds whichever worker or host
+    # serves the next request; a client that does not echo it may not see its own writes on the replica.
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or replica_monitor.engine is None:
+            return await self.app(scope, receive, send)
+
+        writes = RequestWrites()
+
+        async def send_with_write_lsn(message: Message) -> None:
+            if message["type"] == "http.response.start" and writes.committed:
+                try:
+                    MutableHeaders(scope=message)[WRITE_LSN_HEADER] = str(await replica_monitor.primary_lsn())
+                except Exception:
+                    logger.exception("Could not read the WAL position after a write")
+            await send(message)
+
+        token = request_writes.set(writes)
+        try:
+            await self.app(scope, receive, send_with_write_lsn)
+        finally:
+            request_writes.reset(token)
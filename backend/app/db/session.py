@@ -1,15 +1,60 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+import orjson
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 
 from app.core.config import settings
+from app.core.metrics import instrument_engine
+from app.core.query_diagnostics import install_query_recorder
+from app.db.pool import InstrumentedPool
+
+
+def connect_args() -> dict:
+    args = {
+        # SQLAlchemy's prepared statement cache and asyncpg's own one.
+        "prepared_statement_cache_size": settings.db_statement_cache_size,
+        "statement_cache_size": settings.db_statement_cache_size,
+    }
+    if settings.db_statement_timeout_ms > 0:
+        # Sent in the startup packet, so it costs no extra round trip per connection.
+        args["server_settings"] = {"statement_timeout": str(settings.db_statement_timeout_ms)}
+    return args
+
+
+def make_engine(url: str) -> AsyncEngine:
+    engine = create_async_engine(
+        url,
+        future=True,
+        echo=settings.sql_echo,
+        poolclass=InstrumentedPool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout_seconds,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        pool_recycle=settings.db_pool_recycle_seconds,
+        connect_args=connect_args(),
+        json_deserializer=orjson.loads,
+    )
+    instrument_engine(engine)
+    install_query_recorder(engine)
+    return engine
+
+
+engine = make_engine(settings.database_url)
+# Optional hot standby for read-only endpoints; see app.db.replica for when it is actually used.
+replica_engine = make_engine(settings.database_replica_url) if settings.database_replica_url else None
+
+
+def asyncpg_dsn(url: str = settings.database_url) -> str:
+    # For connections opened with asyncpg directly, outside the engine's pool.
+    return make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+
 
-engine = create_async_engine(
-    settings.database_url,
-    future=True,
-    echo=settings.sql_echo,
-    pool_pre_ping=settings.db_pool_pre_ping,
-    pool_recycle=settings.db_pool_recycle_seconds,
-)
 SessionLocal = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+ReplicaSessionLocal = (
+    async_sessionmaker(bind=replica_engine, expire_on_commit=False, class_=AsyncSession)
+    if replica_engine is not None
+    else None
+)
 
 
 async def get_session() -> AsyncSession:
@@ -1,19 +1,56 @@
+import asyncio
+import hmac
 import logging
-from uuid import uuid4
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI, HTTPException, Request, status
+from fastapi.encoders import jsonable_encoder
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from sqlalchemy import text
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
+from app.core.authz import board_owners, workspace_owners
+from app.core.board_events import board_event_hub
 from app.core.config import settings
-from app.db.session import engine
+from app.core.deps import user_cache
+from app.db.pool import pool_stats
+from app.db.replica import ReadYourWritesMiddleware, replica_monitor
+from app.db.session import engine, replica_engine
 from app.core.errors import error_response
-from app.core.rate_limit import AuthRateLimitMiddleware
+from app.core.metrics import MetricsMiddleware, render_metrics
+from app.core.query_diagnostics import QueryDiagnosticsMiddleware
+from app.core.rate_limit import AuthRateLimitMiddleware, build_rate_limiter
+from app.core.request_id import RequestIdMiddleware
+from app.core.token_cleanup import run_refresh_token_pruner
 from app.routers import auth, workspaces, boards, tasks
 
-app = FastAPI(title="Octopis")
+rate_limiter = build_rate_limiter() if settings.auth_rate_limit_enabled else None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    pruner = None
+    if settings.refresh_token_prune_interval_seconds > 0:
+        pruner = asyncio.create_task(run_refresh_token_pruner())
+    if rate_limiter is not None:
+        await rate_limiter.start()
+    if settings.board_events_enabled:
+        await board_event_hub.start()
+    await replica_monitor.start()
+    yield
+    await replica_monitor.stop()
+    await board_event_hub.stop()
+    if rate_limiter is not None:
+        await rate_limiter.stop()
+    if pruner is not None:
+        pruner.cancel()
+        with suppress(asyncio.CancelledError):
+            await pruner
+
+
+app = FastAPI(title="Octopis", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -21,14 +58,23 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Write-Lsn"],
 )
 
-if settings.auth_rate_limit_enabled:
-    app.add_middleware(
-        AuthRateLimitMiddleware,
-        max_requests=settings.auth_rate_limit_requests,
-        window_seconds=settings.auth_rate_limit_window_seconds,
-    )
+# Passes requests straight through unless a replica is configured.
+app.add_middleware(ReadYourWritesMiddleware)
+
+if rate_limiter is not None:
+    app.add_middleware(AuthRateLimitMiddleware, limiter=rate_limiter)
+
+if settings.query_diagnostics_enabled:
+    # Inside RequestIdMiddleware, so reports carry the request id.
+    app.add_middleware(QueryDiagnosticsMiddleware)
+
+app.add_middleware(RequestIdMiddleware)
+
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
 
 app.include_router(auth.router)
 app.include_router(workspaces.router)
@@ -38,15 +84,6 @@ app.include_router(tasks.router)
 logger = logging.getLogger("octopis.api")
 
 
-@app.middleware("http")
-async def request_id_middleware(request: Request, call_next):
-    request_id = request.headers.get("x-request-id") or str(uuid4())
-    request.state.request_id = request_id
-    response = await call_next(request)
-    response.headers["x-request-id"] = request_id
-    return response
-
-
 @app.exception_handler(HTTPException)
 @app.exception_handler(StarletteHTTPException)
 async def http_exception_handler(request: Request, exc: HTTPException):
@@ -67,7 +104,7 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     return error_response(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
         message="Validation failed",
-        details=exc.errors(),
+        details=jsonable_encoder(exc.errors()),
         request_id=getattr(request.state, "request_id", None),
     )
 
@@ -92,6 +129,29 @@ async def healthz():
     return {"status": "ok"}
 
 
+if settings.metrics_enabled:
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics(request: Request):
+        if settings.metrics_token and not hmac.compare_digest(
+            request.headers.get("authorization", ""), f"Bearer {settings.metrics_token}"
+        ):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+        pools = {"primary": pool_stats(engine.pool)}
+        replicas = {}
+        if replica_engine is not None:
+            pools["replica"] = pool_stats(replica_engine.pool)
+            replicas["replica"] = replica_monitor.stats()
+        return PlainTextResponse(
+            render_metrics(
+                pools=pools,
+                caches={"auth_user": user_cache, "board_owner": board_owners, "workspace_owner": workspace_owners},
+                replicas=replicas,
+            ),
+            media_type="text/plain; version=0.0.4",
+        )
+
+
 @app.get("/readyz")
 async def readyz():
     try:
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import BigInteger, Column, Integer, String, Boolean, DateTime, ForeignKey, Text, JSON, Index
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
@@ -23,7 +23,7 @@ class Workspace(Base):
     __tablename__ = "workspaces"
 
     id = Column(Integer, primary_key=True)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
     name = Column(String(255), nullable=False)
     description = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -37,10 +37,12 @@ class Board(Base):
     __tablename__ = "boards"
 
     id = Column(Integer, primary_key=True)
-    workspace_id = Column(Integer, ForeignKey("workspaces.id", ondelete="CASCADE"), nullable=False)
+    workspace_id = Column(Integer, ForeignKey("workspaces.id", ondelete="CASCADE"), nullable=False, index=True)
     name = Column(String(255), nullable=False)
     type = Column(String(32), nullable=False)
     config = Column(JSON)
+    # Bumped by every write that changes what the board's reads return; feeds the ETags.
+    version = Column(BigInteger, default=0, server_default="0", nullable=False)
 
     workspace = relationship("Workspace", back_populates="boards")
     tasks = relationship("Task", back_populates="board", cascade="all, delete-orphan")
@@ -50,7 +52,7 @@ class CustomFieldDefinition(Base):
     __tablename__ = "custom_field_definitions"
 
     id = Column(Integer, primary_key=True)
-    workspace_id = Column(Integer, ForeignKey("workspaces.id", ondelete="CASCADE"), nullable=False)
+    workspace_id = Column(Integer, ForeignKey("workspaces.id", ondelete="CASCADE"), nullable=False, index=True)
     name = Column(String(255), nullable=False)
     field_type = Column(String(32), nullable=False)
     is_required = Column(Boolean, default=False)
@@ -61,12 +63,17 @@ class CustomFieldDefinition(Base):
 
 class Task(Base):
     __tablename__ = "tasks"
+    __table_args__ = (
+        Index("ix_tasks_board_order", "board_id", "position", "rank", "id"),
+        Index("ix_tasks_board_id_due_date", "board_id", "due_date"),
+    )
 
     id = Column(Integer, primary_key=True)
     board_id = Column(Integer, ForeignKey("boards.id", ondelete="CASCADE"), nullable=False)
     title = Column(String(255), nullable=False)
     description = Column(Text)
-    position = Column(Integer, default=0)
+    position = Column(Integer, default=0, nullable=False)
+    rank = Column(String(255, collation="C"), default="", server_default="", nullable=False)
     status = Column(JSON)
     due_date = Column(DateTime)
     labels = Column(JSON)
@@ -78,10 +85,11 @@ class Task(Base):
 
 class TaskData(Base):
     __tablename__ = "task_data"
+    __table_args__ = (Index("uq_task_data_task_id_field_id", "task_id", "custom_field_definition_id", unique=True),)
 
     id = Column(Integer, primary_key=True)
     task_id = Column(Integer, ForeignKey("tasks.id", ondelete="CASCADE"), nullable=False)
-    custom_field_definition_id = Column(Integer, ForeignKey("custom_field_definitions.id", ondelete="CASCADE"), nullable=False)
+    custom_field_definition_id = Column(Integer, ForeignKey("custom_field_definitions.id", ondelete="CASCADE"), nullable=False, index=True)
     value = Column(Text)
 
     task = relationship("Task", back_populates="data")
@@ -90,11 +98,17 @@ class TaskData(Base):
 
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
+    __table_args__ = (
+        Index("ix_refresh_tokens_user_id_expires_at", "user_id", "expires_at"),
+        Index("ix_refresh_tokens_expires_at", "expires_at"),
+    )
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    token = Column(String(512), unique=True, nullable=False)
+    token_hash = Column(String(64), unique=True, nullable=False)
     expires_at = Column(DateTime, nullable=False)
     revoked = Column(Boolean, default=False)
+    # Set when the token is rotated, cleared once the grace window for a concurrent refresh is used.
+    rotated_at = Column(DateTime, nullable=True)
 
     user = relationship("User", back_populates="refresh_tokens")
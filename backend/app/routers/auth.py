@@ -1,19 +1,40 @@
 from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update
 
+from app.db.replica import track_writes
 from app.db.session import get_session
-from app.core.security import hash_password, verify_password, create_access_token, create_refresh_token, decode_token
-from app.core.deps import get_current_user
+from app.core.security import (
+    create_access_token,
+    create_refresh_token,
+    decode_token,
+    hash_password_async,
+    hash_token,
+    successor_jti,
+    verify_password_async,
+)
+from app.core.deps import get_current_user_read
 from app.core.config import settings
 from app import models, schemas
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 
+def issue_refresh_token(
+    db: AsyncSession, user_id: int, issued_at: datetime | None = None, jti: str | None = None
+) -> str:
+    issued_at = issued_at or datetime.utcnow()
+    refresh_token = create_refresh_token(str(user_id), issued_at=issued_at, jti=jti)
+    expires_at = issued_at + timedelta(days=settings.refresh_token_expires_days)
+    db.add(models.RefreshToken(user_id=user_id, token_hash=hash_token(refresh_token), expires_at=expires_at))
+    return refresh_token
+
+
 @router.post("/register", response_model=schemas.UserOut)
 async def register(payload: schemas.RegisterIn, db: AsyncSession = Depends(get_session)):
+    # Hash before touching the database so no pooled connection waits on bcrypt.
+    hashed_password = await hash_password_async(payload.password)
     existing = await db.execute(select(models.User).where(models.User.email == payload.email))
     if existing.scalar_one_or_none():
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email already registered")
@@ -21,7 +42,7 @@ async def register(payload: schemas.RegisterIn, db: AsyncSession = Depends(get_s
     user = models.User(
         email=payload.email,
         username=payload.username,
-        hashed_password=hash_password(payload.password),
+        hashed_password=hashed_password,
     )
     db.add(user)
     await db.commit()
@@ -31,16 +52,24 @@ async def register(payload: schemas.RegisterIn, db: AsyncSession = Depends(get_s
 
 @router.post("/login", response_model=schemas.TokenOut)
 async def login(payload: schemas.LoginIn, db: AsyncSession = Depends(get_session)):
-    result = await db.execute(select(models.User).where(models.User.email == payload.email))
-    user = result.scalar_one_or_none()
-    if not user or not verify_password(payload.password, user.hashed_password):
+    result = await db.execute(
+        select(models.User.id, models.User.hashed_password).where(models.User.email == payload.email)
+    )
+    user = result.first()
+    # End the transaction so the connection goes back to the pool while bcrypt runs.
+    await db.commit()
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    valid, new_hash = await verify_password_async(payload.password, user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    if new_hash:
+        await db.execute(update(models.User).where(models.User.id == user.id).values(hashed_password=new_hash))
 
     access_token = create_access_token(str(user.id))
-    refresh_token = create_refresh_token(str(user.id))
-    expires_at = datetime.utcnow() + timedelta(days=settings.refresh_token_expires_days)
-
-    db.add(models.RefreshToken(user_id=user.id, token=refresh_token, expires_at=expires_at))
+    refresh_token = issue_refresh_token(db, user.id)
+    # The login response carries a WAL position past the registration, so /auth/me finds the new user.
+    track_writes(db)
     await db.commit()
 
     return schemas.TokenOut(access_token=access_token, refresh_token=refresh_token)
@@ -52,20 +81,83 @@ async def refresh(payload: schemas.RefreshIn, db: AsyncSession = Depends(get_ses
     if token_data.get("type") != "refresh":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token type")
 
+    # Each refresh token is good for one rotation: consume it atomically, then issue a replacement.
+    token_hash = hash_token(payload.refresh_token)
+    now = datetime.utcnow()
     result = await db.execute(
-        select(models.RefreshToken).where(
-            models.RefreshToken.token == payload.refresh_token,
+        update(models.RefreshToken)
+        .where(
+            models.RefreshToken.token_hash == token_hash,
             models.RefreshToken.revoked.is_(False),
+            models.RefreshToken.expires_at >= now,
         )
+        .values(revoked=True, rotated_at=now)
+        .returning(models.RefreshToken.user_id)
     )
-    stored = result.scalar_one_or_none()
-    if not stored or stored.expires_at < datetime.utcnow():
+    user_id = result.scalar_one_or_none()
+    if user_id is None:
+        successor = await reissue_successor(db, token_hash, now)
+        if successor is not None:
+            await db.commit()
+            return successor
+        # A revoked token coming back means it leaked: end every session of that user.
+        await db.execute(
+            update(models.RefreshToken)
+            .where(
+                models.RefreshToken.user_id.in_(
+                    select(models.RefreshToken.user_id).where(
+                        models.RefreshToken.token_hash == token_hash,
+                        models.RefreshToken.revoked.is_(True),
+                    )
+                ),
+                models.RefreshToken.revoked.is_(False),
+            )
+            .values(revoked=True)
+        )
+        await db.commit()
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token expired or revoked")
 
-    access_token = create_access_token(token_data.get("sub"))
-    return schemas.TokenOut(access_token=access_token, refresh_token=payload.refresh_token)
+    access_token = create_access_token(str(user_id))
+    refresh_token = issue_refresh_token(db, user_id, now, successor_jti(token_hash))
+    await db.commit()
+    return schemas.TokenOut(access_token=access_token, refresh_token=refresh_token)
+
+
+async def reissue_successor(db: AsyncSession, token_hash: str, now: datetime) -> schemas.TokenOut | None:
+    # Two tabs share the stored refresh token and may both refresh with it at once. The one that lost
+    # the race gets the successor the winner got, once and only within the grace window; the
+    # successor must itself still be unused.
+    if settings.refresh_token_reuse_grace_seconds <= 0:
+        return None
+    result = await db.execute(
+        select(models.RefreshToken.id, models.RefreshToken.user_id, models.RefreshToken.rotated_at)
+        .where(
+            models.RefreshToken.token_hash == token_hash,
+            models.RefreshToken.revoked.is_(True),
+            models.RefreshToken.rotated_at >= now - timedelta(seconds=settings.refresh_token_reuse_grace_seconds),
+        )
+        .with_for_update()
+    )
+    rotated = result.first()
+    if rotated is None:
+        return None
+    await db.execute(update(models.RefreshToken).where(models.RefreshToken.id == rotated.id).values(rotated_at=None))
+
+    refresh_token = create_refresh_token(
+        str(rotated.user_id), issued_at=rotated.rotated_at, jti=successor_jti(token_hash)
+    )
+    result = await db.execute(
+        select(models.RefreshToken.id).where(
+            models.RefreshToken.token_hash == hash_token(refresh_token),
+            models.RefreshToken.revoked.is_(False),
+            models.RefreshToken.expires_at >= now,
+        )
+    )
+    if result.scalar_one_or_none() is None:
+        return None
+    return schemas.TokenOut(access_token=create_access_token(str(rotated.user_id)), refresh_token=refresh_token)
 
 
 @router.get("/me", response_model=schemas.UserOut)
-async def me(user=Depends(get_current_user)):
+async def me(user=Depends(get_current_user_read)):
     return user
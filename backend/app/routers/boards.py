@@ -1,40 +1,52 @@
-﻿from fastapi import APIRouter, Depends, HTTPException, status
+﻿import json
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request, Response, WebSocket, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, update
+from sqlalchemy import Integer, Text, bindparam, select, text, update
+from sqlalchemy.dialects.postgresql import ARRAY
 
-from app.db.session import get_session
-from app.core.deps import get_current_user
+from app.db.session import SessionLocal, get_session
+from app.core.authz import (
+    forget_board,
+    require_board,
+    require_board_workspace,
+    require_workspace,
+    user_owns_workspace,
+    workspace_must_exist,
+)
+from app.core.board_events import board_event_hub, publish_board_event, stream_board_events
+from app.core.config import settings
+from app.core.deps import get_current_user, get_read_session, get_token_user_id, load_current_user
+from app.core.etag import (
+    CACHE_CONTROL,
+    bump_board_version,
+    etag_matches,
+    get_current_board_version,
+    make_etag,
+    not_modified,
+)
+from app.core.fast_json import json_bytes_response
+from app.core.ranking import rebalance_board_ranks_in_background, resolve_placement
 from app import models, schemas
 
 router = APIRouter(prefix="/boards", tags=["boards"])
 
 
-async def get_board_for_user(db: AsyncSession, board_id: int, user_id: int) -> models.Board | None:
-    result = await db.execute(
-        select(models.Board)
-        .join(models.Workspace, models.Board.workspace_id == models.Workspace.id)
-        .where(models.Board.id == board_id, models.Workspace.user_id == user_id)
-    )
-    return result.scalar_one_or_none()
-
-
 @router.get("/{workspace_id}/", response_model=list[schemas.BoardOut])
-async def list_boards(workspace_id: int, user=Depends(get_current_user), db: AsyncSession = Depends(get_session)):
+async def list_boards(workspace_id: int, user=Depends(get_current_user), db: AsyncSession = Depends(get_read_session)):
+    if not await user_owns_workspace(db, workspace_id, user.id):
+        return []
     result = await db.execute(
-        select(models.Board)
-        .join(models.Workspace, models.Board.workspace_id == models.Workspace.id)
-        .where(models.Board.workspace_id == workspace_id, models.Workspace.user_id == user.id)
+        select(models.Board.id, models.Board.workspace_id, models.Board.name, models.Board.type, models.Board.config)
+        .where(models.Board.workspace_id == workspace_id)
+        .order_by(models.Board.id)
     )
-    return result.scalars().all()
+    return json_bytes_response([dict(row) for row in result.mappings()])
 
 
 @router.post("/", response_model=schemas.BoardOut)
 async def create_board(payload: schemas.BoardCreate, user=Depends(get_current_user), db: AsyncSession = Depends(get_session)):
-    workspace = await db.execute(
-        select(models.Workspace).where(models.Workspace.id == payload.workspace_id, models.Workspace.user_id == user.id)
-    )
-    if not workspace.scalar_one_or_none():
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workspace not found")
+    await require_workspace(db, payload.workspace_id, user.id)
 
     board = models.Board(
         workspace_id=payload.workspace_id,
@@ -43,7 +55,8 @@ async def create_board(payload: schemas.BoardCreate, user=Depends(get_current_us
         config=payload.config,
     )
     db.add(board)
-    await db.commit()
+    async with workspace_must_exist(db, payload.workspace_id):
+        await db.commit()
     await db.refresh(board)
     return board
 
@@ -55,13 +68,12 @@ async def update_board(
     user=Depends(get_current_user),
     db: AsyncSession = Depends(get_session),
 ):
-    board = await get_board_for_user(db, board_id, user.id)
-    if not board:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Board not found")
+    board = await require_board(db, board_id, user.id)
 
     if payload.name is not None:
         board.name = payload.name
 
+    await bump_board_version(db, board_id)
     await db.commit()
     await db.refresh(board)
     return board
@@ -73,9 +85,7 @@ async def delete_board(
     user=Depends(get_current_user),
     db: AsyncSession = Depends(get_session),
 ):
-    board = await get_board_for_user(db, board_id, user.id)
-    if not board:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Board not found")
+    board = await require_board(db, board_id, user.id)
 
     await db.delete(board)
     await db.commit()
@@ -83,30 +93,191 @@ async def delete_board(
 
 
 @router.get("/{board_id}/meta", response_model=schemas.BoardOut)
-async def board_meta(board_id: int, user=Depends(get_current_user), db: AsyncSession = Depends(get_session)):
-    board = await get_board_for_user(db, board_id, user.id)
-    if not board:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Board not found")
+async def board_meta(
+    board_id: int,
+    request: Request,
+    response: Response,
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_session),
+):
+    board = await require_board(db, board_id, user.id)
+    etag = make_etag("board", board.id, board.version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
     return board
 
 
-@router.put("/{board_id}/tasks/reorder")
+SNAPSHOT_SQL = text(
+    """
+    SELECT b.version, json_build_object(
+        'board', json_build_object(
+            'id', b.id, 'workspace_id', b.workspace_id, 'name', b.name, 'type', b.type, 'config', b.config
+        ),
+        'fields', COALESCE((
+            SELECT json_agg(
+                json_build_object('id', f.id, 'name', f.name, 'field_type', f.field_type, 'is_required', f.is_required)
+                ORDER BY f.id
+            )
+            FROM custom_field_definitions AS f
+            WHERE f.workspace_id = b.workspace_id
+        ), '[]'),
+        'tasks', COALESCE((
+            SELECT json_agg(
+                json_build_object(
+                    'id', t.id, 'board_id', t.board_id, 'title', t.title, 'description', t.description,
+                    'status', t.status, 'position', t.position, 'rank', t.rank, 'due_date', t.due_date,
+                    'labels', t.labels, 'checklist', t.checklist,
+                    'custom_fields', COALESCE((
+                        SELECT json_agg(
+                            json_build_object('field_id', d.custom_field_definition_id, 'value', d.value) ORDER BY d.id
+                        )
+                        FROM task_data AS d
+                        WHERE d.task_id = t.id
+                    ), '[]')
+                )
+                ORDER BY t.position, t.rank, t.id
+            )
+            FROM tasks AS t
+            WHERE t.board_id = b.id
+        ), '[]')
+    )::text
+    FROM boards AS b
+    WHERE b.id = :board_id
+    """
+)
+
+
+@router.get("/{board_id}/snapshot", response_model=schemas.BoardSnapshotOut)
+async def board_snapshot(
+    board_id: int,
+    request: Request,
+    min_version: int | None = None,
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_session),
+    primary: AsyncSession = Depends(get_session),
+):
+    # Everything BoardView needs to open a board: one request and one statement, with the JSON
+    # document assembled by Postgres and passed through as text, never parsed or re-encoded here.
+    await require_board_workspace(db, board_id, user.id)
+    if request.headers.get("if-none-match"):
+        db, version = await get_current_board_version(db, primary, board_id, min_version)
+        etag = make_etag("snapshot", board_id, version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+    row = (await db.execute(SNAPSHOT_SQL, {"board_id": board_id})).first()
+    if row is not None and min_version is not None and row.version < min_version and db is not primary:
+        # The replica has not replayed the change the client was told about yet.
+        row = (await primary.execute(SNAPSHOT_SQL, {"board_id": board_id})).first()
+    if row is None:
+        forget_board(board_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Board not found")
+    version, document = row
+    # The version comes from the same statement as the body, so the tag always describes it exactly.
+    headers = {"ETag": make_etag("snapshot", board_id, version), "Cache-Control": CACHE_CONTROL}
+    return Response(document.encode("utf-8"), media_type="application/json", headers=headers)
+
+
+@router.websocket("/{board_id}/events")
+async def board_events(websocket: WebSocket, board_id: int, token: str = ""):
+    # Browsers cannot set Authorization on a WebSocket handshake, so the access token comes in the
+    # query. The session is closed before the socket is accepted: a connection is never held for the
+    # lifetime of a subscription.
+    async with SessionLocal() as db:
+        try:
+            user = await load_current_user(db, await get_token_user_id(token))
+            await require_board_workspace(db, board_id, user.id)
+        except HTTPException:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+    if not board_event_hub.running:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+
+    await websocket.accept()
+    subscriber = board_event_hub.subscribe(board_id)
+    try:
+        await stream_board_events(websocket, subscriber, settings.board_events_ping_seconds)
+    finally:
+        board_event_hub.unsubscribe(subscriber)
+
+
+@router.put("/{board_id}/tasks/reorder", response_model=schemas.TaskReorderOut)
 async def reorder_tasks(
     board_id: int,
     payload: schemas.TaskReorderIn,
+    background_tasks: BackgroundTasks,
     user=Depends(get_current_user),
     db: AsyncSession = Depends(get_session),
 ):
-    board = await get_board_for_user(db, board_id, user.id)
-    if not board:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Board not found")
+    await require_board_workspace(db, board_id, user.id)
+
+    updated = await apply_task_reorder(db, board_id, [item for item in payload.items if not item.is_placement])
 
+    # "Place between" moves write one row each; they run in order so later items can use earlier ones as neighbours.
+    rebalance = False
     for item in payload.items:
-        await db.execute(
+        if not item.is_placement:
+            continue
+        if item.task_id in (item.after_task_id, item.before_task_id):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Task cannot be placed next to itself")
+        position, rank = await resolve_placement(
+            db, board_id, item.after_task_id, item.before_task_id, item.task_id
+        )
+        result = await db.execute(
             update(models.Task)
             .where(models.Task.id == item.task_id, models.Task.board_id == board_id)
-            .values(status=item.status, position=item.position)
+            .values(status=item.status, position=position, rank=rank)
+            .returning(models.Task.id)
         )
+        updated.update(result.scalars().all())
+        rebalance = rebalance or len(rank) > settings.task_rank_max_length
 
+    if updated:
+        version = await bump_board_version(db, board_id)
+        await publish_board_event(db, board_id, "tasks_reordered", sorted(updated), version)
     await db.commit()
-    return {"status": "ok"}
+    if rebalance:
+        background_tasks.add_task(rebalance_board_ranks_in_background, board_id)
+
+    requested = list(dict.fromkeys(item.task_id for item in payload.items))
+    return {
+        "status": "ok",
+        "updated": [task_id for task_id in requested if task_id in updated],
+        "not_found": [task_id for task_id in requested if task_id not in updated],
+    }
+
+
+REORDER_SQL = text(
+    """
+    UPDATE tasks AS t
+    SET status = CAST(v.status AS JSONB), position = v.position
+    FROM unnest(:ids, :statuses, :positions) AS v(id, status, position)
+    WHERE t.id = v.id AND t.board_id = :board_id
+    RETURNING t.id
+    """
+).bindparams(
+    bindparam("ids", type_=ARRAY(Integer)),
+    bindparam("statuses", type_=ARRAY(Text)),
+    bindparam("positions", type_=ARRAY(Integer)),
+)
+
+
+async def apply_task_reorder(db: AsyncSession, board_id: int, items: list[schemas.TaskReorderItem]) -> set[int]:
+    # One UPDATE ... FROM unnest(...) for the whole drag instead of a round trip per card.
+    # The last entry wins when a task id is repeated, as it did with sequential updates.
+    latest = {item.task_id: item for item in items}
+    if not latest:
+        return set()
+    result = await db.execute(
+        REORDER_SQL,
+        {
+            "ids": list(latest),
+            "statuses": [json.dumps(item.status) for item in latest.values()],
+            "positions": [item.position for item in latest.values()],
+            "board_id": board_id,
+        },
+    )
+    return set(result.scalars().all())
@@ -1,34 +1,74 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import Integer, any_, bindparam, delete, literal, select, tuple_, type_coerce
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, insert
 from sqlalchemy.orm import selectinload
 
 from app.db.session import get_session
-from app.core.deps import get_current_user
+from app.core.authz import board_must_exist, require_board_workspace, resolve_board_workspace
+from app.core.board_events import publish_board_event
+from app.core.config import settings
+from app.core.deps import get_current_user, get_read_session
+from app.core.etag import (
+    CACHE_CONTROL,
+    bump_board_version,
+    etag_matches,
+    get_current_board_version,
+    make_etag,
+    not_modified,
+    query_fingerprint,
+)
+from app.core.fast_json import json_bytes_response
+from app.core.pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor
+from app.core.ranking import rebalance_board_ranks_in_background, resolve_placement
 from app import models, schemas
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
+# Same fields as schemas.TaskOut, minus custom_fields which are attached separately.
+TASK_LIST_COLUMNS = (
+    models.Task.id,
+    models.Task.board_id,
+    models.Task.title,
+    models.Task.description,
+    models.Task.status,
+    models.Task.position,
+    models.Task.rank,
+    models.Task.due_date,
+    models.Task.labels,
+    models.Task.checklist,
+)
+
 
-async def get_board_for_user(db: AsyncSession, board_id: int, user_id: int) -> models.Board | None:
+async def ensure_fields_in_workspace(db: AsyncSession, field_ids: list[int], workspace_id: int) -> None:
     result = await db.execute(
-        select(models.Board)
-        .join(models.Workspace, models.Board.workspace_id == models.Workspace.id)
-        .where(models.Board.id == board_id, models.Workspace.user_id == user_id)
+        select(models.CustomFieldDefinition.id).where(
+            models.CustomFieldDefinition.id.in_(field_ids),
+            models.CustomFieldDefinition.workspace_id == workspace_id,
+        )
     )
-    return result.scalar_one_or_none()
+    if len(set(result.scalars().all())) != len(set(field_ids)):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid custom field")
 
 
-async def ensure_field_in_workspace(db: AsyncSession, field_id: int, workspace_id: int) -> bool:
-    result = await db.execute(
-        select(models.CustomFieldDefinition)
-        .where(models.CustomFieldDefinition.id == field_id, models.CustomFieldDefinition.workspace_id == workspace_id)
+async def upsert_task_data(db: AsyncSession, task_id: int, values: dict[int, str]) -> dict[int, str | None]:
+    statement = insert(models.TaskData).values(
+        [{"task_id": task_id, "custom_field_definition_id": field_id, "value": value} for field_id, value in values.items()]
     )
-    return result.scalar_one_or_none() is not None
+    statement = statement.on_conflict_do_update(
+        index_elements=[models.TaskData.task_id, models.TaskData.custom_field_definition_id],
+        set_={"value": statement.excluded.value},
+    ).returning(models.TaskData.custom_field_definition_id, models.TaskData.value)
+    result = await db.execute(statement)
+    return {row.custom_field_definition_id: row.value for row in result}
 
 
-def task_to_schema(task: models.Task) -> schemas.TaskOut:
-    custom_fields = [schemas.TaskDataOut(field_id=d.custom_field_definition_id, value=d.value) for d in task.data]
+def task_to_schema(task: models.Task, field_values: dict[int, str | None] | None = None) -> schemas.TaskOut:
+    if field_values is None:
+        field_values = {d.custom_field_definition_id: d.value for d in task.data}
+    custom_fields = [schemas.TaskDataOut(field_id=field_id, value=value) for field_id, value in field_values.items()]
     return schemas.TaskOut(
         id=task.id,
         board_id=task.board_id,
@@ -36,6 +76,7 @@ def task_to_schema(task: models.Task) -> schemas.TaskOut:
         description=task.description,
         status=task.status,
         position=task.position,
+        rank=task.rank,
         due_date=task.due_date,
         labels=task.labels,
         checklist=task.checklist,
@@ -43,71 +84,147 @@ def task_to_schema(task: models.Task) -> schemas.TaskOut:
     )
 
 
-@router.get("/")
-async def list_tasks(board_id: int, user=Depends(get_current_user), db: AsyncSession = Depends(get_session)):
-    board = await get_board_for_user(db, board_id, user.id)
-    if not board:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Board not found")
+@router.get("/", response_model=list[schemas.TaskOut])
+async def list_tasks(
+    request: Request,
+    board_id: int,
+    status_in: list[str] | None = Query(None, alias="status"),
+    labels: list[str] | None = Query(None, alias="label"),
+    due_from: datetime | None = None,
+    due_to: datetime | None = None,
+    field_id: int | None = None,
+    field_value: str | None = None,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    min_version: int | None = None,
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_read_session),
+    primary: AsyncSession = Depends(get_session),
+):
+    if field_value is not None and field_id is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="field_value requires field_id")
+    await require_board_workspace(db, board_id, user.id)
+    # The version is read before the tasks, so a concurrent write can only make the tag older than
+    # the body (one extra refetch later), never serve a stale body under a current tag.
+    db, version = await get_current_board_version(db, primary, board_id, min_version)
+    etag = make_etag("tasks", board_id, version, query_fingerprint(request))
+    if etag_matches(request, etag):
+        return not_modified(etag)
 
-    result = await db.execute(
-        select(models.Task).where(models.Task.board_id == board_id).options(selectinload(models.Task.data))
-    )
-    tasks = result.scalars().all()
-    return [task_to_schema(t) for t in tasks]
+    query = select(*TASK_LIST_COLUMNS).where(models.Task.board_id == board_id)
+    if status_in:
+        query = query.where(type_coerce(models.Task.status, JSONB).in_([literal(value, JSONB) for value in status_in]))
+    if labels:
+        query = query.where(type_coerce(models.Task.labels, JSONB).contains(labels))
+    if due_from is not None:
+        query = query.where(models.Task.due_date >= due_from)
+    if due_to is not None:
+        query = query.where(models.Task.due_date <= due_to)
+    if field_id is not None:
+        field_match = select(models.TaskData.id).where(
+            models.TaskData.task_id == models.Task.id,
+            models.TaskData.custom_field_definition_id == field_id,
+        )
+        if field_value is not None:
+            field_match = field_match.where(models.TaskData.value == field_value)
+        query = query.where(field_match.exists())
+
+    if cursor is not None:
+        after = decode_cursor(cursor)
+        if (
+            not isinstance(after.get("position"), int)
+            or not isinstance(after.get("rank"), str)
+            or not isinstance(after.get("id"), int)
+        ):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        query = query.where(
+            tuple_(models.Task.position, models.Task.rank, models.Task.id)
+            > tuple_(after["position"], after["rank"], after["id"])
+        )
+
+    # (board_id, position, rank, id) is indexed, so each page is a range scan in display order.
+    query = query.order_by(models.Task.position, models.Task.rank, models.Task.id)
+    if limit is not None:
+        query = query.limit(limit + 1)
+
+    result = await db.execute(query)
+    tasks = [dict(row) for row in result.mappings()]
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if limit is not None and len(tasks) > limit:
+        tasks = tasks[:limit]
+        last = tasks[-1]
+        headers["X-Next-Cursor"] = encode_cursor({"position": last["position"], "rank": last["rank"], "id": last["id"]})
+
+    custom_fields = {}
+    if tasks:
+        result = await db.execute(
+            select(models.TaskData.task_id, models.TaskData.custom_field_definition_id, models.TaskData.value)
+            .where(models.TaskData.task_id == any_(bindparam("task_ids", [t["id"] for t in tasks], type_=ARRAY(Integer))))
+            .order_by(models.TaskData.id)
+        )
+        for task_id, field_id, value in result:
+            custom_fields.setdefault(task_id, []).append({"field_id": field_id, "value": value})
+    for task in tasks:
+        task["custom_fields"] = custom_fields.get(task["id"], [])
+    return json_bytes_response(tasks, headers=headers)
 
 
 @router.post("/", response_model=schemas.TaskOut)
 async def create_task(
     payload: schemas.TaskCreate,
+    background_tasks: BackgroundTasks,
     user=Depends(get_current_user),
     db: AsyncSession = Depends(get_session),
 ):
-    board = await get_board_for_user(db, payload.board_id, user.id)
-    if not board:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Board not found")
+    workspace_id = await require_board_workspace(db, payload.board_id, user.id)
+
+    position, rank = payload.position or 0, ""
+    if payload.after_task_id is not None or payload.before_task_id is not None:
+        position, rank = await resolve_placement(db, payload.board_id, payload.after_task_id, payload.before_task_id)
+        if len(rank) > settings.task_rank_max_length:
+            background_tasks.add_task(rebalance_board_ranks_in_background, payload.board_id)
 
     task = models.Task(
         board_id=payload.board_id,
         title=payload.title,
         description=payload.description,
         status=payload.status,
-        position=payload.position or 0,
+        position=position,
+        rank=rank,
         due_date=payload.due_date,
         labels=payload.labels,
         checklist=payload.checklist,
     )
+    if payload.custom_fields:
+        await ensure_fields_in_workspace(db, list(payload.custom_fields), workspace_id)
     db.add(task)
-    await db.flush()
+    async with board_must_exist(db, payload.board_id):
+        await db.flush()
 
+    field_values = {}
     if payload.custom_fields:
-        for field_id, value in payload.custom_fields.items():
-            if not await ensure_field_in_workspace(db, field_id, board.workspace_id):
-                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid custom field")
-            db.add(models.TaskData(task_id=task.id, custom_field_definition_id=field_id, value=value))
+        field_values = await upsert_task_data(db, task.id, payload.custom_fields)
 
+    version = await bump_board_version(db, payload.board_id)
+    await publish_board_event(db, payload.board_id, "task_created", [task.id], version)
     await db.commit()
-    result = await db.execute(
-        select(models.Task).where(models.Task.id == task.id).options(selectinload(models.Task.data))
-    )
-    return task_to_schema(result.scalar_one())
+    return task_to_schema(task, field_values)
 
 
 @router.put("/{task_id}", response_model=schemas.TaskOut)
 async def update_task(
     task_id: int,
     payload: schemas.TaskUpdate,
+    background_tasks: BackgroundTasks,
     user=Depends(get_current_user),
     db: AsyncSession = Depends(get_session),
 ):
     result = await db.execute(
-        select(models.Task)
-        .options(selectinload(models.Task.board))
-        .join(models.Board, models.Task.board_id == models.Board.id)
-        .join(models.Workspace, models.Board.workspace_id == models.Workspace.id)
-        .where(models.Task.id == task_id, models.Workspace.user_id == user.id)
+        select(models.Task).options(selectinload(models.Task.data)).where(models.Task.id == task_id)
     )
     task = result.scalar_one_or_none()
-    if not task:
+    workspace_id = await resolve_board_workspace(db, task.board_id, user.id) if task else None
+    if workspace_id is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
 
     if payload.title is not None:
@@ -118,6 +235,15 @@ async def update_task(
         task.status = payload.status
     if payload.position is not None:
         task.position = payload.position
+    if payload.after_task_id is not None or payload.before_task_id is not None:
+        if task.id in (payload.after_task_id, payload.before_task_id):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Task cannot be placed next to itself")
+        # A move only rewrites this row; the neighbours keep their keys.
+        task.position, task.rank = await resolve_placement(
+            db, task.board_id, payload.after_task_id, payload.before_task_id, task.id
+        )
+        if len(task.rank) > settings.task_rank_max_length:
+            background_tasks.add_task(rebalance_board_ranks_in_background, task.board_id)
     if payload.due_date is not None:
         task.due_date = payload.due_date
     if payload.labels is not None:
@@ -125,41 +251,27 @@ async def update_task(
     if payload.checklist is not None:
         task.checklist = payload.checklist
 
-    if payload.custom_fields is not None:
-        for field_id, value in payload.custom_fields.items():
-            if not await ensure_field_in_workspace(db, field_id, task.board.workspace_id):
-                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid custom field")
-            existing = await db.execute(
-                select(models.TaskData).where(
-                    models.TaskData.task_id == task.id,
-                    models.TaskData.custom_field_definition_id == field_id,
-                )
-            )
-            record = existing.scalar_one_or_none()
-            if record:
-                record.value = value
-            else:
-                db.add(models.TaskData(task_id=task.id, custom_field_definition_id=field_id, value=value))
+    field_values = {d.custom_field_definition_id: d.value for d in task.data}
+    if payload.custom_fields:
+        await ensure_fields_in_workspace(db, list(payload.custom_fields), workspace_id)
+        field_values.update(await upsert_task_data(db, task.id, payload.custom_fields))
 
+    version = await bump_board_version(db, task.board_id)
+    await publish_board_event(db, task.board_id, "task_updated", [task.id], version)
     await db.commit()
-    result = await db.execute(
-        select(models.Task).where(models.Task.id == task.id).options(selectinload(models.Task.data))
-    )
-    return task_to_schema(result.scalar_one())
+    return task_to_schema(task, field_values)
 
 
 @router.delete("/{task_id}")
 async def delete_task(task_id: int, user=Depends(get_current_user), db: AsyncSession = Depends(get_session)):
-    result = await db.execute(
-        select(models.Task)
-        .join(models.Board, models.Task.board_id == models.Board.id)
-        .join(models.Workspace, models.Board.workspace_id == models.Workspace.id)
-        .where(models.Task.id == task_id, models.Workspace.user_id == user.id)
-    )
-    task = result.scalar_one_or_none()
-    if not task:
+    result = await db.execute(select(models.Task.board_id).where(models.Task.id == task_id))
+    board_id = result.scalar_one_or_none()
+    if board_id is None or await resolve_board_workspace(db, board_id, user.id) is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Task not found")
 
-    await db.delete(task)
+    # task_data rows go with the task through the ON DELETE CASCADE foreign key.
+    await db.execute(delete(models.Task).where(models.Task.id == task_id))
+    version = await bump_board_version(db, board_id)
+    await publish_board_event(db, board_id, "task_deleted", [task_id], version)
     await db.commit()
     return {"status": "deleted"}
@@ -1,10 +1,26 @@
-﻿from fastapi import APIRouter, Depends, HTTPException, status
+﻿from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, text
 import json
 
+import asyncpg
+
 from app.db.session import get_session
-from app.core.deps import get_current_user
+from app.core.authz import require_workspace, workspace_must_exist
+from app.core.deps import get_current_user, get_read_session
+from app.core.etag import bump_workspace_board_versions
+from app.core.fast_json import json_bytes_response
+from app.core.jsonb_filter import compile_record_filter
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, encode_cursor
+from app.core.records_io import (
+    EXPORT_FORMATS,
+    IMPORT_BATCH_SIZE,
+    MAX_IMPORT_BATCH_SIZE,
+    RecordImportError,
+    iter_import_rows,
+    stream_records,
+)
 from app import models, schemas
 
 router = APIRouter(prefix="/workspaces", tags=["workspaces"])
@@ -25,6 +41,7 @@ async def create_workspace_storage(db: AsyncSession, workspace_id: int) -> None:
     )
     """
     await db.execute(text(sql))
+    await db.execute(text(f"CREATE INDEX IF NOT EXISTS {table}_data_idx ON {table} USING GIN (data jsonb_path_ops)"))
 
 
 @router.get("/", response_model=list[schemas.WorkspaceOut])
@@ -117,13 +134,9 @@ async def delete_workspace(
 async def list_fields(
     workspace_id: int,
     user=Depends(get_current_user),
-    db: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_read_session),
 ):
-    result = await db.execute(
-        select(models.Workspace).where(models.Workspace.id == workspace_id, models.Workspace.user_id == user.id)
-    )
-    if not result.scalar_one_or_none():
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workspace not found")
+    await require_workspace(db, workspace_id, user.id)
 
     fields = await db.execute(
         select(models.CustomFieldDefinition).where(models.CustomFieldDefinition.workspace_id == workspace_id)
@@ -138,11 +151,7 @@ async def add_field(
     user=Depends(get_current_user),
     db: AsyncSession = Depends(get_session),
 ):
-    result = await db.execute(
-        select(models.Workspace).where(models.Workspace.id == workspace_id, models.Workspace.user_id == user.id)
-    )
-    if not result.scalar_one_or_none():
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workspace not found")
+    await require_workspace(db, workspace_id, user.id)
 
     field = models.CustomFieldDefinition(
         workspace_id=workspace_id,
@@ -151,26 +160,71 @@ async def add_field(
         is_required=payload.is_required,
     )
     db.add(field)
+    async with workspace_must_exist(db, workspace_id):
+        await db.flush()
+    # Field definitions are part of what every board in the workspace renders.
+    await bump_workspace_board_versions(db, workspace_id)
     await db.commit()
     await db.refresh(field)
     return field
 
 
-@router.get("/{workspace_id}/records", response_model=list[schemas.WorkspaceRecordOut])
+@router.get("/{workspace_id}/records", response_model=schemas.WorkspaceRecordPage)
 async def list_records(
     workspace_id: int,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after_id: int | None = Query(None, ge=1),
+    cursor: str | None = None,
+    filter_spec: str | None = Query(None, alias="filter", description="JSON filter over record data"),
     user=Depends(get_current_user),
-    db: AsyncSession = Depends(get_session),
+    db: AsyncSession = Depends(get_read_session),
 ):
-    result = await db.execute(
-        select(models.Workspace).where(models.Workspace.id == workspace_id, models.Workspace.user_id == user.id)
+    await require_workspace(db, workspace_id, user.id)
+
+    if cursor is not None:
+        after_id = decode_cursor(cursor).get("id")
+        if not isinstance(after_id, int):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    # Newest first; the primary key index turns each page into a bounded range scan.
+    table = workspace_table_name(workspace_id)
+    filter_sql, binds = compile_record_filter(filter_spec)
+    conditions = [filter_sql] if filter_sql else []
+    params = {"limit": limit + 1}
+    if after_id is not None:
+        conditions.append("id < :after_id")
+        params["after_id"] = after_id
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    rows = await db.execute(
+        text(f"SELECT id, data, created_at FROM {table} {where} ORDER BY id DESC LIMIT :limit").bindparams(*binds),
+        params,
     )
-    if not result.scalar_one_or_none():
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workspace not found")
+    items = [dict(row) for row in rows.mappings().all()]
+
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor({"id": items[-1]["id"]})
+    return json_bytes_response({"items": items, "next_cursor": next_cursor})
+
+
+@router.get("/{workspace_id}/records/export")
+async def export_records(
+    workspace_id: int,
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    filter_spec: str | None = Query(None, alias="filter", description="JSON filter over record data"),
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_session),
+):
+    await require_workspace(db, workspace_id, user.id)
 
     table = workspace_table_name(workspace_id)
-    rows = await db.execute(text(f"SELECT id, data, created_at FROM {table} ORDER BY id DESC"))
-    return [dict(row) for row in rows.mappings().all()]
+    filter_sql, binds = compile_record_filter(filter_spec)
+    return StreamingResponse(
+        stream_records(table, fmt, filter_sql, binds),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{table}.{fmt}"'},
+    )
 
 
 @router.post("/{workspace_id}/records", response_model=schemas.WorkspaceRecordOut)
@@ -180,11 +234,7 @@ async def create_record(
     user=Depends(get_current_user),
     db: AsyncSession = Depends(get_session),
 ):
-    result = await db.execute(
-        select(models.Workspace).where(models.Workspace.id == workspace_id, models.Workspace.user_id == user.id)
-    )
-    if not result.scalar_one_or_none():
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workspace not found")
+    await require_workspace(db, workspace_id, user.id)
 
     table = workspace_table_name(workspace_id)
     insert = text(
@@ -199,6 +249,58 @@ async def create_record(
     return dict(row.mappings().first())
 
 
+@router.post("/{workspace_id}/records/import", response_model=schemas.WorkspaceRecordImportOut)
+async def import_records(
+    workspace_id: int,
+    request: Request,
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    batch_size: int = Query(IMPORT_BATCH_SIZE, ge=1, le=MAX_IMPORT_BATCH_SIZE),
+    user=Depends(get_current_user),
+    db: AsyncSession = Depends(get_session),
+):
+    await require_workspace(db, workspace_id, user.id)
+    # Hand the connection back to the pool while the upload is being read.
+    await db.commit()
+
+    table = workspace_table_name(workspace_id)
+    batches: list[dict] = []
+    imported = 0
+
+    async def flush(rows: list[tuple[str]], first_line: int, last_line: int) -> None:
+        nonlocal imported
+        connection = await db.connection()
+        raw = await connection.get_raw_connection()
+        try:
+            await raw.driver_connection.copy_records_to_table(table, records=rows, columns=["data"])
+        except asyncpg.DataError as exc:
+            # Anything jsonb refuses that the parser let through (e.g. a \u0000 escape); earlier batches stay.
+            await db.rollback()
+            raise RecordImportError(first_line, f"Lines {first_line}-{last_line} rejected: {exc}")
+        await db.commit()
+        imported += len(rows)
+        batches.append({"batch": len(batches) + 1, "rows": len(rows), "first_line": first_line, "last_line": last_line})
+
+    batch: list[tuple[str]] = []
+    first_line = 0
+    try:
+        async for line_no, data in iter_import_rows(request.stream(), fmt):
+            if not batch:
+                first_line = line_no
+            batch.append((data,))
+            if len(batch) >= batch_size:
+                await flush(batch, first_line, line_no)
+                batch = []
+        if batch:
+            await flush(batch, first_line, line_no)
+    except RecordImportError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail={"message": exc.message, "line": exc.line, "imported": imported, "batches": batches},
+        )
+
+    return {"imported": imported, "batches": batches}
+
+
 @router.put("/{workspace_id}/records/{record_id}", response_model=schemas.WorkspaceRecordOut)
 async def update_record(
     workspace_id: int,
@@ -207,11 +309,7 @@ async def update_record(
     user=Depends(get_current_user),
     db: AsyncSession = Depends(get_session),
 ):
-    result = await db.execute(
-        select(models.Workspace).where(models.Workspace.id == workspace_id, models.Workspace.user_id == user.id)
-    )
-    if not result.scalar_one_or_none():
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workspace not found")
+    await require_workspace(db, workspace_id, user.id)
 
     table = workspace_table_name(workspace_id)
     update = text(
@@ -237,11 +335,7 @@ async def delete_record(
     user=Depends(get_current_user),
     db: AsyncSession = Depends(get_session),
 ):
-    result = await db.execute(
-        select(models.Workspace).where(models.Workspace.id == workspace_id, models.Workspace.user_id == user.id)
-    )
-    if not result.scalar_one_or_none():
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workspace not found")
+    await require_workspace(db, workspace_id, user.id)
 
     table = workspace_table_name(workspace_id)
     deleted = await db.execute(text(f"DELETE FROM {table} WHERE id = :record_id"), {"record_id": record_id})
@@ -255,11 +349,7 @@ async def delete_records(
     user=Depends(get_current_user),
     db: AsyncSession = Depends(get_session),
 ):
-    result = await db.execute(
-        select(models.Workspace).where(models.Workspace.id == workspace_id, models.Workspace.user_id == user.id)
-    )
-    if not result.scalar_one_or_none():
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Workspace not found")
+    await require_workspace(db, workspace_id, user.id)
 
     table = workspace_table_name(workspace_id)
     deleted = await db.execute(text(f"DELETE FROM {table}"))
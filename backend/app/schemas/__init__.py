@@ -8,8 +8,11 @@ from .workspaces import (
     WorkspaceRecordCreate,
     WorkspaceRecordUpdate,
     WorkspaceRecordOut,
+    WorkspaceRecordPage,
+    WorkspaceRecordImportBatch,
+    WorkspaceRecordImportOut,
 )
-from .boards import BoardCreate, BoardUpdate, BoardOut, TaskReorderIn, TaskReorderItem
+from .boards import BoardCreate, BoardUpdate, BoardOut, BoardSnapshotOut, TaskReorderIn, TaskReorderItem, TaskReorderOut
 from .tasks import TaskCreate, TaskUpdate, TaskOut, TaskDataOut
 
 __all__ = [
@@ -26,11 +29,16 @@ __all__ = [
     "WorkspaceRecordCreate",
     "WorkspaceRecordUpdate",
     "WorkspaceRecordOut",
+    "WorkspaceRecordPage",
+    "WorkspaceRecordImportBatch",
+    "WorkspaceRecordImportOut",
     "BoardCreate",
     "BoardUpdate",
     "BoardOut",
+    "BoardSnapshotOut",
     "TaskReorderIn",
     "TaskReorderItem",
+    "TaskReorderOut",
     "TaskCreate",
     "TaskUpdate",
     "TaskOut",
@@ -1,6 +1,9 @@
-﻿from pydantic import BaseModel, ConfigDict
+﻿from pydantic import BaseModel, ConfigDict, model_validator
 from typing import Any
 
+from .tasks import TaskOut
+from .workspaces import CustomFieldOut
+
 
 class BoardCreate(BaseModel):
     workspace_id: int
@@ -23,11 +26,35 @@ class BoardOut(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class BoardSnapshotOut(BaseModel):
+    board: BoardOut
+    fields: list[CustomFieldOut]
+    tasks: list[TaskOut]
+
+
 class TaskReorderItem(BaseModel):
     task_id: int
     status: Any | None = None
-    position: int
+    position: int | None = None
+    after_task_id: int | None = None
+    before_task_id: int | None = None
+
+    @model_validator(mode="after")
+    def check_placement(self):
+        if self.position is None and self.after_task_id is None and self.before_task_id is None:
+            raise ValueError("Either position or after_task_id/before_task_id is required")
+        return self
+
+    @property
+    def is_placement(self) -> bool:
+        return self.after_task_id is not None or self.before_task_id is not None
 
 
 class TaskReorderIn(BaseModel):
     items: list[TaskReorderItem]
+
+
+class TaskReorderOut(BaseModel):
+    status: str = "ok"
+    updated: list[int]
+    not_found: list[int]
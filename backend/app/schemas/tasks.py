@@ -9,6 +9,8 @@ class TaskCreate(BaseModel):
     description: str | None = None
     status: Any | None = None
     position: int | None = None
+    after_task_id: int | None = None
+    before_task_id: int | None = None
     due_date: datetime | None = None
     labels: list[str] | None = None
     checklist: list[dict] | None = None
@@ -20,6 +22,8 @@ class TaskUpdate(BaseModel):
     description: str | None = None
     status: Any | None = None
     position: int | None = None
+    after_task_id: int | None = None
+    before_task_id: int | None = None
     due_date: datetime | None = None
     labels: list[str] | None = None
     checklist: list[dict] | None = None
@@ -38,6 +42,7 @@ class TaskOut(BaseModel):
     description: str | None = None
     status: Any | None = None
     position: int
+    rank: str = ""
     due_date: datetime | None = None
     labels: list[str] | None = None
     checklist: list[dict] | None = None
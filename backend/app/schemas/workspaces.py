@@ -47,3 +47,20 @@ class WorkspaceRecordOut(BaseModel):
     id: int
     data: dict
     created_at: datetime
+
+
+class WorkspaceRecordPage(BaseModel):
+    items: list[WorkspaceRecordOut]
+    next_cursor: str | None = None
+
+
+class WorkspaceRecordImportBatch(BaseModel):
+    batch: int
+    rows: int
+    first_line: int
+    last_line: int
+
+
+class WorkspaceRecordImportOut(BaseModel):
+    imported: int
+    batches: list[WorkspaceRecordImportBatch]
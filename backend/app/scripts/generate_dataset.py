@@ -0,0 +1,336 @@
+import argparse
+import asyncio
+import json
+import logging
+import math
+import multiprocessing
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from time import perf_counter
+
+import asyncpg
+
+from app.core.security import hash_password
+from app.db.session import SessionLocal, asyncpg_dsn, engine
+from app.routers.workspaces import create_workspace_storage, workspace_table_name
+
+logger = logging.getLogger("octopis.generate_dataset")
+
+CHUNK_ROWS = 50_000
+STATUSES = ("todo", "in progress", "review", "done")
+LABELS = ("backend", "frontend", "bug", "feature", "urgent", "design", "infra", "docs")
+FIELD_TYPES = ("text", "number", "date")
+OWNERS = ("ann", "bob", "carol", "dave", "erin", "frank", "grace", "heidi")
+
+TASK_COLUMNS = ["id", "board_id", "title", "description", "position", "rank", "status", "due_date", "labels", "checklist"]
+TASK_DATA_COLUMNS = ["task_id", "custom_field_definition_id", "value"]
+RECORD_COLUMNS = ["created_at", "updated_at", "data"]
+
+
+@dataclass
+class TaskChunk:
+    board_id: int
+    statuses: list[str]
+    first_task_id: int
+    first_position: int
+    count: int
+    fields: list[tuple[int, str]]
+    field_fill: float
+    seed: int
+
+
+@dataclass
+class RecordChunk:
+    table: str
+    count: int
+    seed: int
+
+
+async def reserve_ids(connection: asyncpg.Connection, table: str, count: int) -> int:
+    # Claims a contiguous id block so rows can be COPYed with ids known up front (tasks need theirs
+    # for task_data). The lock keeps concurrent inserts from drawing ids out of the block meanwhile.
+    async with connection.transaction():
+        await connection.execute(f"LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE")
+        last = await connection.fetchval(
+            "SELECT setval(pg_get_serial_sequence($1, 'id'), nextval(pg_get_serial_sequence($1, 'id')) + $2 - 1)",
+            table,
+            count,
+        )
+    return last - count + 1
+
+
+def skewed_counts(total: int, buckets: int, skew: float, rng: random.Random) -> list[int]:
+    # Zipf-like: the largest bucket gets the most rows, the long tail very few.
+    weights = [1 / (rank**skew) for rank in range(1, buckets + 1)]
+    rng.shuffle(weights)
+    scale = total / sum(weights)
+    counts = [int(weight * scale) for weight in weights]
+    if counts:
+        counts[weights.index(max(weights))] += total - sum(counts)
+    return counts
+
+
+def log_uniform(low: int, high: int, rng: random.Random) -> int:
+    return int(math.exp(rng.uniform(math.log(max(low, 1)), math.log(max(high, low, 1)))))
+
+
+def task_rows(chunk: TaskChunk) -> tuple[list[tuple], list[tuple]]:
+    rng = random.Random(chunk.seed)
+    now = datetime.utcnow()
+    statuses = [json.dumps(status) for status in chunk.statuses]
+    label_sets = [json.dumps(rng.sample(LABELS, k)) for k in (0, 1, 2, 3) for _ in range(4)]
+    checklists = [None, json.dumps([{"text": "review", "done": False}, {"text": "ship", "done": False}])]
+    tasks = []
+    task_data = []
+    for offset in range(chunk.count):
+        task_id = chunk.first_task_id + offset
+        position = chunk.first_position + offset
+        due_date = now + timedelta(days=rng.randrange(-30, 90)) if rng.random() < 0.4 else None
+        tasks.append(
+            (
+                task_id,
+                chunk.board_id,
+                f"Task {position}",
+                "Generated task" if rng.random() < 0.5 else None,
+                position,
+                "",
+                statuses[rng.randrange(len(statuses))],
+                due_date,
+                label_sets[rng.randrange(len(label_sets))],
+                checklists[rng.random() < 0.2],
+            )
+        )
+        for field_id, field_type in chunk.fields:
+            if rng.random() < chunk.field_fill:
+                if field_type == "number":
+                    value = str(rng.randrange(10_000))
+                elif field_type == "date":
+                    value = (now + timedelta(days=rng.randrange(365))).date().isoformat()
+                else:
+                    value = OWNERS[rng.randrange(len(OWNERS))]
+                task_data.append((task_id, field_id, value))
+    return tasks, task_data
+
+
+def record_rows(chunk: RecordChunk) -> list[tuple]:
+    rng = random.Random(chunk.seed)
+    now = datetime.utcnow()
+    rows = []
+    for _ in range(chunk.count):
+        created_at = now - timedelta(minutes=rng.randrange(525_600))
+        data = {
+            "status": rng.choice(("open", "closed", "pending")),
+            "amount": rng.randrange(100_000),
+            "owner": {"name": OWNERS[rng.randrange(len(OWNERS))]},
+            "tags": rng.sample(LABELS, rng.randrange(4)),
+        }
+        rows.append((created_at, created_at, json.dumps(data)))
+    return rows
+
+
+async def copy_chunk(dsn: str, chunk: TaskChunk | RecordChunk) -> int:
+    connection = await asyncpg.connect(dsn)
+    try:
+        if isinstance(chunk, TaskChunk):
+            tasks, task_data = task_rows(chunk)
+            await connection.copy_records_to_table("tasks", records=tasks, columns=TASK_COLUMNS)
+            if task_data:
+                await connection.copy_records_to_table("task_data", records=task_data, columns=TASK_DATA_COLUMNS)
+            return len(tasks) + len(task_data)
+        rows = record_rows(chunk)
+        await connection.copy_records_to_table(chunk.table, records=rows, columns=RECORD_COLUMNS)
+        return len(rows)
+    finally:
+        await connection.close()
+
+
+def load_chunk(dsn: str, chunk: TaskChunk | RecordChunk) -> int:
+    # Runs in a worker process: row generation is CPU bound, so each stream gets its own interpreter.
+    return asyncio.run(copy_chunk(dsn, chunk))
+
+
+async def create_accounts(connection: asyncpg.Connection, args: argparse.Namespace) -> dict:
+    now = datetime.utcnow()
+    # One bcrypt hash for everyone: every generated user can log in with --password.
+    hashed = hash_password(args.password)
+
+    first_user = await reserve_ids(connection, "users", args.users)
+    user_ids = list(range(first_user, first_user + args.users))
+    await connection.copy_records_to_table(
+        "users",
+        records=[(user_id, f"{args.prefix}-{user_id}@example.com", None, hashed, True, now) for user_id in user_ids],
+        columns=["id", "email", "username", "hashed_password", "is_active", "created_at"],
+    )
+
+    workspace_count = args.users * args.workspaces_per_user
+    first_workspace = await reserve_ids(connection, "workspaces", workspace_count)
+    workspaces = [
+        (first_workspace + index, user_ids[index // args.workspaces_per_user]) for index in range(workspace_count)
+    ]
+    await connection.copy_records_to_table(
+        "workspaces",
+        records=[(workspace_id, user_id, f"Workspace {workspace_id}", None, now) for workspace_id, user_id in workspaces],
+        columns=["id", "user_id", "name", "description", "created_at"],
+    )
+
+    fields: dict[int, list[tuple[int, str]]] = {}
+    if args.fields_per_workspace:
+        next_field = await reserve_ids(connection, "custom_field_definitions", workspace_count * args.fields_per_workspace)
+        rows = []
+        for workspace_id, _ in workspaces:
+            for index in range(args.fields_per_workspace):
+                field_type = FIELD_TYPES[index % len(FIELD_TYPES)]
+                fields.setdefault(workspace_id, []).append((next_field, field_type))
+                rows.append((next_field, workspace_id, f"{field_type} {index + 1}", field_type, False))
+                next_field += 1
+        await connection.copy_records_to_table(
+            "custom_field_definitions",
+            records=rows,
+            columns=["id", "workspace_id", "name", "field_type", "is_required"],
+        )
+
+    board_count = workspace_count * args.boards_per_workspace
+    first_board = await reserve_ids(connection, "boards", board_count)
+    boards = [
+        (first_board + index, workspaces[index // args.boards_per_workspace][0]) for index in range(board_count)
+    ]
+    await connection.copy_records_to_table(
+        "boards",
+        records=[
+            (board_id, workspace_id, f"Board {board_id}", "kanban", json.dumps(list(STATUSES)), 0)
+            for board_id, workspace_id in boards
+        ],
+        columns=["id", "workspace_id", "name", "type", "config", "version"],
+    )
+    return {"users": user_ids, "workspaces": [workspace_id for workspace_id, _ in workspaces], "boards": boards, "fields": fields}
+
+
+def plan_chunks(
+    plan: dict,
+    first_task_id: int,
+    task_counts: list[int],
+    record_counts: list[int],
+    args: argparse.Namespace,
+    rng: random.Random,
+) -> list[TaskChunk | RecordChunk]:
+    chunks: list[TaskChunk | RecordChunk] = []
+    next_task_id = first_task_id
+    for (board_id, workspace_id), count in zip(plan["boards"], task_counts):
+        for first_position in range(0, count, CHUNK_ROWS):
+            size = min(CHUNK_ROWS, count - first_position)
+            chunks.append(
+                TaskChunk(
+                    board_id=board_id,
+                    statuses=list(STATUSES),
+                    first_task_id=next_task_id,
+                    first_position=first_position,
+                    count=size,
+                    fields=plan["fields"].get(workspace_id, []),
+                    field_fill=args.field_fill,
+                    seed=rng.getrandbits(32),
+                )
+            )
+            next_task_id += size
+    for workspace_id, count in zip(plan["workspaces"], record_counts):
+        for offset in range(0, count, CHUNK_ROWS):
+            chunks.append(
+                RecordChunk(
+                    table=workspace_table_name(workspace_id),
+                    count=min(CHUNK_ROWS, count - offset),
+                    seed=rng.getrandbits(32),
+                )
+            )
+    # Largest first, so a big board's last chunk does not end up running alone at the tail.
+    chunks.sort(key=lambda chunk: chunk.count, reverse=True)
+    return chunks
+
+
+async def generate(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    dsn = asyncpg_dsn()
+    started = perf_counter()
+
+    connection = await asyncpg.connect(dsn)
+    try:
+        plan = await create_accounts(connection, args)
+        board_count = len(plan["boards"])
+        task_counts = [log_uniform(args.tasks_min, args.tasks_max, rng) for _ in range(board_count)]
+        total_tasks = sum(task_counts)
+        first_task_id = await reserve_ids(connection, "tasks", total_tasks) if total_tasks else 0
+    finally:
+        await connection.close()
+
+    # Per-workspace record tables are created the same way the API creates them.
+    async with SessionLocal() as db:
+        for workspace_id in plan["workspaces"]:
+            await create_workspace_storage(db, workspace_id)
+        await db.commit()
+    await engine.dispose()
+    record_counts = skewed_counts(args.records, len(plan["workspaces"]), args.records_skew, rng)
+    logger.info(
+        "Created %s users, %s workspaces, %s boards; loading %s tasks and %s records",
+        len(plan["users"]),
+        len(plan["workspaces"]),
+        board_count,
+        total_tasks,
+        sum(record_counts),
+    )
+
+    chunks = plan_chunks(plan, first_task_id, task_counts, record_counts, args, rng)
+    loaded = 0
+    loop = asyncio.get_running_loop()
+    copy_started = perf_counter()
+    with ProcessPoolExecutor(max_workers=args.parallel, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending = [loop.run_in_executor(pool, load_chunk, dsn, chunk) for chunk in chunks]
+        for done, future in enumerate(asyncio.as_completed(pending), start=1):
+            loaded += await future
+            if done % max(1, len(pending) // 20) == 0 or done == len(pending):
+                elapsed = perf_counter() - copy_started
+                logger.info("%s/%s chunks, %s rows, %.0f rows/s", done, len(pending), loaded, loaded / elapsed)
+
+    connection = await asyncpg.connect(dsn)
+    try:
+        for table in ("users", "workspaces", "custom_field_definitions", "boards", "tasks", "task_data"):
+            await connection.execute(f"ANALYZE {table}")
+    finally:
+        await connection.close()
+
+    return {
+        "users": len(plan["users"]),
+        "workspaces": len(plan["workspaces"]),
+        "boards": board_count,
+        "tasks": total_tasks,
+        "records": sum(record_counts),
+        "largest_board_tasks": max(task_counts, default=0),
+        "largest_workspace_records": max(record_counts, default=0),
+        "copied_rows": loaded,
+        "seconds": round(perf_counter() - started, 1),
+        "login": {"email": f"{args.prefix}-{plan['users'][0]}@example.com", "password": args.password},
+    }
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+    parser = argparse.ArgumentParser(description="Generate a large synthetic dataset with parallel COPY streams.")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--workspaces-per-user", type=int, default=1)
+    parser.add_argument("--boards-per-workspace", type=int, default=3)
+    parser.add_argument("--tasks-min", type=int, default=10_000, help="Tasks per board, drawn log-uniformly.")
+    parser.add_argument("--tasks-max", type=int, default=100_000)
+    parser.add_argument("--fields-per-workspace", type=int, default=3)
+    parser.add_argument("--field-fill", type=float, default=0.6, help="Share of tasks with a value per custom field.")
+    parser.add_argument("--records", type=int, default=1_000_000, help="Records across all workspaces.")
+    parser.add_argument("--records-skew", type=float, default=1.2, help="Zipf exponent of records per workspace.")
+    parser.add_argument("--parallel", type=int, default=4, help="Concurrent COPY streams (worker processes).")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--prefix", default="gen", help="Email prefix: <prefix>-<user id>@example.com.")
+    parser.add_argument("--password", default="password123")
+    args = parser.parse_args()
+    summary = asyncio.run(generate(args))
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
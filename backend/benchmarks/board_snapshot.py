@@ -0,0 +1,131 @@
+import argparse
+import asyncio
+import json
+import statistics
+from time import perf_counter
+from uuid import uuid4
+
+import httpx
+from sqlalchemy import delete, insert
+
+from app import models
+from app.core.security import create_access_token
+from app.db.session import SessionLocal, engine
+from app.main import app
+
+
+async def create_board(task_count: int, field_count: int) -> tuple[int, int, int]:
+    async with SessionLocal() as db:
+        user = models.User(email=f"bench-{uuid4().hex[:12]}@example.com", hashed_password="-")
+        db.add(user)
+        await db.flush()
+        workspace = models.Workspace(user_id=user.id, name="snapshot benchmark")
+        db.add(workspace)
+        await db.flush()
+        board = models.Board(workspace_id=workspace.id, name="snapshot benchmark", type="kanban", config=["todo", "done"])
+        db.add(board)
+        await db.flush()
+        fields = [
+            models.CustomFieldDefinition(workspace_id=workspace.id, name=f"field {i}", field_type="text")
+            for i in range(field_count)
+        ]
+        db.add_all(fields)
+        await db.flush()
+        result = await db.execute(
+            insert(models.Task).returning(models.Task.id),
+            [
+                {
+                    "board_id": board.id,
+                    "title": f"task {i}",
+                    "description": "benchmark task " * 4,
+                    "status": "todo" if i % 2 else "done",
+                    "position": i,
+                    "labels": ["backend", "perf"],
+                    "checklist": [{"text": "step", "done": False}],
+                }
+                for i in range(task_count)
+            ],
+        )
+        task_ids = list(result.scalars().all())
+        if fields:
+            await db.execute(
+                insert(models.TaskData),
+                [
+                    {"task_id": task_id, "custom_field_definition_id": field.id, "value": f"value {task_id}"}
+                    for task_id in task_ids
+                    for field in fields
+                ],
+            )
+        await db.commit()
+        return user.id, workspace.id, board.id
+
+
+async def measure(load, rounds: int) -> tuple[dict, dict]:
+    await load()
+    timings = []
+    payload = {}
+    for _ in range(rounds):
+        started = perf_counter()
+        payload = await load()
+        timings.append((perf_counter() - started) * 1000)
+    timings.sort()
+    return {"mean_ms": round(statistics.fmean(timings), 2), "p50_ms": round(timings[len(timings) // 2], 2)}, payload
+
+
+async def main(task_count: int, field_count: int, rounds: int) -> None:
+    user_id, workspace_id, board_id = await create_board(task_count, field_count)
+    headers = {"Authorization": f"Bearer {create_access_token(str(user_id))}"}
+    urls = {
+        "board": f"/boards/{board_id}/meta",
+        "fields": f"/workspaces/{workspace_id}/fields",
+        "tasks": f"/tasks/?board_id={board_id}",
+    }
+    try:
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://benchmark", headers=headers
+        ) as client:
+
+            async def get(url: str):
+                response = await client.get(url)
+                response.raise_for_status()
+                return response.json()
+
+            async def sequential() -> dict:
+                return {name: await get(url) for name, url in urls.items()}
+
+            async def concurrent() -> dict:
+                # What BoardView did: the separate calls fired together.
+                return dict(zip(urls, await asyncio.gather(*(get(url) for url in urls.values()))))
+
+            async def snapshot() -> dict:
+                return await get(f"/boards/{board_id}/snapshot")
+
+            sequential_report, legacy_payload = await measure(sequential, rounds)
+            concurrent_report, _ = await measure(concurrent, rounds)
+            snapshot_report, snapshot_payload = await measure(snapshot, rounds)
+        report = {
+            "tasks": task_count,
+            "custom_fields_per_task": field_count,
+            "rounds": rounds,
+            "separate_calls_sequential": sequential_report,
+            "separate_calls_concurrent": concurrent_report,
+            "snapshot": snapshot_report,
+            "same_payload": legacy_payload == snapshot_payload,
+            "speedup_vs_sequential": round(sequential_report["mean_ms"] / snapshot_report["mean_ms"], 2),
+            "speedup_vs_concurrent": round(concurrent_report["mean_ms"] / snapshot_report["mean_ms"], 2),
+        }
+        print(json.dumps(report, indent=2))
+    finally:
+        async with SessionLocal() as db:
+            await db.execute(delete(models.User).where(models.User.id == user_id))
+            await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Opening a board: meta, fields and tasks calls versus one snapshot.")
+    parser.add_argument("--tasks", type=int, default=500)
+    parser.add_argument("--fields", type=int, default=3)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.tasks, args.fields, args.rounds))
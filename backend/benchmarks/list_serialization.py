@@ -0,0 +1,132 @@
+import argparse
+import asyncio
+import json
+import statistics
+from time import perf_counter
+from uuid import uuid4
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app import models, schemas
+from app.core.security import create_access_token
+from app.db.session import SessionLocal, engine, get_session
+from app.main import app
+from app.routers.tasks import task_to_schema
+
+# The previous list_tasks body: ORM rows, one TaskOut per task, then response_model serialization.
+legacy_app = FastAPI()
+
+
+@legacy_app.get("/tasks/", response_model=list[schemas.TaskOut])
+async def legacy_list_tasks(board_id: int, db: AsyncSession = Depends(get_session)):
+    result = await db.execute(
+        select(models.Task)
+        .where(models.Task.board_id == board_id)
+        .order_by(models.Task.position, models.Task.rank, models.Task.id)
+        .options(selectinload(models.Task.data))
+    )
+    return [task_to_schema(t) for t in result.scalars().all()]
+
+
+async def create_board(task_count: int, field_count: int) -> tuple[int, int]:
+    async with SessionLocal() as db:
+        user = models.User(email=f"bench-{uuid4().hex[:12]}@example.com", hashed_password="-")
+        db.add(user)
+        await db.flush()
+        workspace = models.Workspace(user_id=user.id, name="serialization benchmark")
+        db.add(workspace)
+        await db.flush()
+        board = models.Board(workspace_id=workspace.id, name="serialization benchmark", type="kanban", config=["todo"])
+        db.add(board)
+        await db.flush()
+        fields = [
+            models.CustomFieldDefinition(workspace_id=workspace.id, name=f"field {i}", field_type="text")
+            for i in range(field_count)
+        ]
+        db.add_all(fields)
+        await db.flush()
+        result = await db.execute(
+            insert(models.Task).returning(models.Task.id),
+            [
+                {
+                    "board_id": board.id,
+                    "title": f"task {i}",
+                    "description": "benchmark task " * 4,
+                    "status": "todo",
+                    "position": i,
+                    "labels": ["backend", "perf"],
+                    "checklist": [{"text": "step", "done": False}],
+                }
+                for i in range(task_count)
+            ],
+        )
+        task_ids = list(result.scalars().all())
+        if fields:
+            await db.execute(
+                insert(models.TaskData),
+                [
+                    {"task_id": task_id, "custom_field_definition_id": field.id, "value": f"value {task_id}"}
+                    for task_id in task_ids
+                    for field in fields
+                ],
+            )
+        await db.commit()
+        return user.id, board.id
+
+
+async def measure(client: httpx.AsyncClient, url: str, rounds: int) -> tuple[dict, bytes]:
+    timings = []
+    body = b""
+    for _ in range(rounds):
+        started = perf_counter()
+        response = await client.get(url)
+        timings.append((perf_counter() - started) * 1000)
+        response.raise_for_status()
+        body = response.content
+    timings.sort()
+    return {
+        "mean_ms": round(statistics.fmean(timings), 1),
+        "p50_ms": round(timings[len(timings) // 2], 1),
+        "bytes": len(body),
+    }, body
+
+
+async def main(task_count: int, field_count: int, rounds: int) -> None:
+    user_id, board_id = await create_board(task_count, field_count)
+    headers = {"Authorization": f"Bearer {create_access_token(str(user_id))}"}
+    url = f"/tasks/?board_id={board_id}"
+    try:
+        async with (
+            httpx.AsyncClient(transport=httpx.ASGITransport(app=legacy_app), base_url="http://legacy") as legacy,
+            httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app", headers=headers) as current,
+        ):
+            legacy_report, legacy_body = await measure(legacy, url, rounds)
+            fast_report, fast_body = await measure(current, url, rounds)
+        report = {
+            "tasks": task_count,
+            "custom_fields_per_task": field_count,
+            "rounds": rounds,
+            "pydantic_models": legacy_report,
+            "row_bytes": fast_report,
+            "same_payload": json.loads(legacy_body) == json.loads(fast_body),
+            "speedup": round(legacy_report["mean_ms"] / fast_report["mean_ms"], 1),
+        }
+        print(json.dumps(report, indent=2))
+    finally:
+        async with SessionLocal() as db:
+            await db.execute(delete(models.User).where(models.User.id == user_id))
+            await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-row Pydantic and direct-bytes serialization of list_tasks.")
+    parser.add_argument("--tasks", type=int, default=10_000)
+    parser.add_argument("--fields", type=int, default=2)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.tasks, args.fields, args.rounds))
@@ -0,0 +1,398 @@
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+from uuid import uuid4
+
+import httpx
+from sqlalchemy import text
+
+from app.db.session import engine
+from app.routers.workspaces import workspace_table_name
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+REPO_DIR = BACKEND_DIR.parent
+PASSWORD = "load-test-password"
+
+
+@dataclass
+class VirtualUser:
+    email: str
+    headers: dict = field(default_factory=dict)
+    workspace_id: int = 0
+    board_id: int = 0
+    task_ids: list[int] = field(default_factory=list)
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    async def call(self, client: httpx.AsyncClient, user: VirtualUser | None, op: str, method: str, url: str, **kwargs):
+        started = perf_counter()
+        try:
+            response = await client.request(method, url, headers=user.headers if user else None, **kwargs)
+        except httpx.HTTPError:
+            self.errors[op] += 1
+            return None
+        self.latencies[op].append((perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            self.errors[op] += 1
+            return None
+        return response
+
+
+# One iteration of each scenario per call; every virtual user loops on it until the duration ends.
+
+
+async def auth_scenario(client, user: VirtualUser, recorder: Recorder, run_id: str) -> None:
+    email = f"load-{run_id}-{uuid4().hex[:10]}@example.com"
+    await recorder.call(client, None, "POST /auth/register", "POST", "/auth/register", json={"email": email, "password": PASSWORD})
+    response = await recorder.call(
+        client, None, "POST /auth/login", "POST", "/auth/login", json={"email": email, "password": PASSWORD}
+    )
+    if response is not None:
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        await recorder.call(client, VirtualUser(email, headers), "GET /auth/me", "GET", "/auth/me")
+
+
+async def workspaces_scenario(client, user: VirtualUser, recorder: Recorder, run_id: str) -> None:
+    # Workspace DELETE is disabled in this tree, so created workspaces are dropped by cleanup().
+    response = await recorder.call(client, user, "POST /workspaces/", "POST", "/workspaces/", json={"name": "load"})
+    if response is None:
+        return
+    workspace_id = response.json()["id"]
+    await recorder.call(client, user, "GET /workspaces/{id}", "GET", f"/workspaces/{workspace_id}")
+    await recorder.call(
+        client, user, "PUT /workspaces/{id}", "PUT", f"/workspaces/{workspace_id}", json={"name": "load renamed"}
+    )
+    await recorder.call(client, user, "GET /workspaces/", "GET", "/workspaces/")
+
+
+async def crud_scenario(client, user: VirtualUser, recorder: Recorder, run_id: str) -> None:
+    response = await recorder.call(
+        client,
+        user,
+        "POST /boards/",
+        "POST",
+        "/boards/",
+        json={"workspace_id": user.workspace_id, "name": "crud", "type": "kanban", "config": ["todo", "done"]},
+    )
+    if response is None:
+        return
+    board_id = response.json()["id"]
+    await recorder.call(client, user, "PUT /boards/{id}", "PUT", f"/boards/{board_id}", json={"name": "crud renamed"})
+    response = await recorder.call(
+        client, user, "POST /tasks/", "POST", "/tasks/", json={"board_id": board_id, "title": "crud", "status": "todo"}
+    )
+    if response is not None:
+        task_id = response.json()["id"]
+        await recorder.call(
+            client, user, "PUT /tasks/{id}", "PUT", f"/tasks/{task_id}", json={"title": "crud renamed", "status": "done"}
+        )
+        await recorder.call(client, user, "GET /tasks/", "GET", "/tasks/", params={"board_id": board_id})
+        await recorder.call(client, user, "DELETE /tasks/{id}", "DELETE", f"/tasks/{task_id}")
+    await recorder.call(client, user, "DELETE /boards/{id}", "DELETE", f"/boards/{board_id}")
+
+
+async def reorder_scenario(client, user: VirtualUser, recorder: Recorder, run_id: str) -> None:
+    moved = random.sample(user.task_ids, min(5, len(user.task_ids)))
+    items = [
+        {"task_id": task_id, "status": random.choice(("todo", "done")), "position": random.randrange(len(user.task_ids))}
+        for task_id in moved
+    ]
+    await recorder.call(
+        client, user, "PUT /boards/{id}/tasks/reorder", "PUT", f"/boards/{user.board_id}/tasks/reorder", json={"items": items}
+    )
+    anchor, placed = random.sample(user.task_ids, 2)
+    items = [{"task_id": placed, "status": "todo", "after_task_id": anchor}]
+    await recorder.call(
+        client, user, "PUT /boards/{id}/tasks/reorder (place)", "PUT", f"/boards/{user.board_id}/tasks/reorder", json={"items": items}
+    )
+
+
+async def records_scenario(client, user: VirtualUser, recorder: Recorder, run_id: str) -> None:
+    url = f"/workspaces/{user.workspace_id}/records"
+    response = await recorder.call(client, user, "GET /workspaces/{id}/records", "GET", url, params={"limit": 50})
+    if response is not None and response.json()["next_cursor"]:
+        await recorder.call(
+            client,
+            user,
+            "GET /workspaces/{id}/records (next page)",
+            "GET",
+            url,
+            params={"limit": 50, "cursor": response.json()["next_cursor"]},
+        )
+    await recorder.call(
+        client,
+        user,
+        "GET /workspaces/{id}/records (filter)",
+        "GET",
+        url,
+        params={"limit": 50, "filter": json.dumps({"status": "open"})},
+    )
+    await recorder.call(client, user, "POST /workspaces/{id}/records", "POST", url, json={"data": {"status": "open"}})
+
+
+async def read_scenario(client, user: VirtualUser, recorder: Recorder, run_id: str) -> None:
+    await recorder.call(client, user, "GET /boards/{id}/snapshot", "GET", f"/boards/{user.board_id}/snapshot")
+    await recorder.call(client, user, "GET /tasks/", "GET", "/tasks/", params={"board_id": user.board_id})
+    await recorder.call(client, user, "GET /boards/{id}/meta", "GET", f"/boards/{user.board_id}/meta")
+    await recorder.call(client, user, "GET /boards/{workspace_id}/", "GET", f"/boards/{user.workspace_id}/")
+
+
+SCENARIOS = {
+    "auth": auth_scenario,
+    "workspaces": workspaces_scenario,
+    "crud": crud_scenario,
+    "reorder": reorder_scenario,
+    "records": records_scenario,
+    "read": read_scenario,
+}
+
+
+async def seed_user(client: httpx.AsyncClient, run_id: str, index: int, tasks: int, records: int) -> VirtualUser:
+    user = VirtualUser(email=f"load-{run_id}-seed{index}@example.com")
+    credentials = {"email": user.email, "password": PASSWORD}
+    (await client.post("/auth/register", json=credentials)).raise_for_status()
+    response = await client.post("/auth/login", json=credentials)
+    response.raise_for_status()
+    user.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    response = await client.post("/workspaces/", json={"name": "load seed"}, headers=user.headers)
+    response.raise_for_status()
+    user.workspace_id = response.json()["id"]
+    response = await client.post(
+        "/boards/",
+        json={"workspace_id": user.workspace_id, "name": "load seed", "type": "kanban", "config": ["todo", "done"]},
+        headers=user.headers,
+    )
+    response.raise_for_status()
+    user.board_id = response.json()["id"]
+    for position in range(tasks):
+        response = await client.post(
+            "/tasks/",
+            json={"board_id": user.board_id, "title": f"seed {position}", "status": "todo", "position": position},
+            headers=user.headers,
+        )
+        response.raise_for_status()
+        user.task_ids.append(response.json()["id"])
+    if records:
+        body = "\n".join(
+            json.dumps({"status": random.choice(("open", "closed")), "n": n}) for n in range(records)
+        ).encode()
+        response = await client.post(
+            f"/workspaces/{user.workspace_id}/records/import", content=body, headers=user.headers
+        )
+        response.raise_for_status()
+    return user
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    # Nearest-rank, so every reported value is a latency that was actually observed.
+    index = max(0, math.ceil(p / 100 * len(sorted_values)) - 1)
+    return round(sorted_values[index], 2)
+
+
+def summarize(recorder: Recorder, elapsed: float) -> dict:
+    operations = {}
+    for op in sorted(set(recorder.latencies) | set(recorder.errors)):
+        values = sorted(recorder.latencies.get(op, []))
+        entry = {"requests": len(values), "errors": recorder.errors.get(op, 0), "rps": round(len(values) / elapsed, 1)}
+        if values:
+            entry.update(
+                p50_ms=percentile(values, 50),
+                p95_ms=percentile(values, 95),
+                p99_ms=percentile(values, 99),
+                max_ms=round(values[-1], 2),
+            )
+        operations[op] = entry
+    total = sum(len(values) for values in recorder.latencies.values())
+    return {
+        "requests": total,
+        "errors": sum(recorder.errors.values()),
+        "rps": round(total / elapsed, 1),
+        "operations": operations,
+    }
+
+
+async def run_scenario(client, users: list[VirtualUser], name: str, duration: float, run_id: str) -> dict:
+    scenario = SCENARIOS[name]
+    recorder = Recorder()
+    deadline = perf_counter() + duration
+
+    async def virtual_user(user: VirtualUser) -> None:
+        while perf_counter() < deadline:
+            await scenario(client, user, recorder, run_id)
+
+    started = perf_counter()
+    await asyncio.gather(*(virtual_user(user) for user in users))
+    return summarize(recorder, perf_counter() - started)
+
+
+def compare(report: dict, baseline: dict) -> dict:
+    # Ratios against a previous report: > 1 means slower (latency) or faster (rps) than the baseline.
+    changes = {}
+    for name, scenario in report["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        ops = {}
+        for op, entry in scenario["operations"].items():
+            old = before["operations"].get(op)
+            if not old or "p95_ms" not in old or "p95_ms" not in entry:
+                continue
+            ops[op] = {
+                "p50_ratio": round(entry["p50_ms"] / old["p50_ms"], 2),
+                "p95_ratio": round(entry["p95_ms"] / old["p95_ms"], 2),
+                "rps_ratio": round(entry["rps"] / old["rps"], 2) if old["rps"] else None,
+            }
+        changes[name] = {"rps_ratio": round(scenario["rps"] / before["rps"], 2) if before["rps"] else None, "operations": ops}
+    return changes
+
+
+def start_database() -> None:
+    # Same image, credentials and database as the db service the app is developed against.
+    subprocess.run(
+        ["docker", "compose", "-f", str(REPO_DIR / "docker-compose.yml"), "up", "-d", "--wait", "db"], check=True
+    )
+
+
+def migrate() -> None:
+    subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], cwd=BACKEND_DIR, check=True)
+
+
+def start_server(port: int, workers: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "PYTHONPATH": str(BACKEND_DIR),
+        # Every virtual user logs in from 127.0.0.1; the limiter would turn the auth scenario into 429s.
+        "OCTOPIS_AUTH_RATE_LIMIT_ENABLED": "false",
+    }
+    command = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers),
+        "--log-level", "warning", "--no-access-log",
+    ]
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env)
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float = 30) -> None:
+    deadline = perf_counter() + timeout
+    while True:
+        try:
+            if (await client.get("/readyz")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        if perf_counter() > deadline:
+            raise RuntimeError("Server did not become ready")
+        await asyncio.sleep(0.2)
+
+
+async def cleanup(run_id: str) -> None:
+    pattern = f"load-{run_id}-%"
+    async with engine.begin() as connection:
+        result = await connection.execute(
+            text("SELECT w.id FROM workspaces w JOIN users u ON u.id = w.user_id WHERE u.email LIKE :pattern"),
+            {"pattern": pattern},
+        )
+        for workspace_id in result.scalars().all():
+            await connection.execute(text(f"DROP TABLE IF EXISTS {workspace_table_name(workspace_id)}"))
+        # Workspaces, boards, tasks and refresh tokens go with the users through ON DELETE CASCADE.
+        await connection.execute(text("DELETE FROM users WHERE email LIKE :pattern"), {"pattern": pattern})
+    await engine.dispose()
+
+
+def git_commit() -> str | None:
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True)
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+async def main(args: argparse.Namespace) -> None:
+    if args.start_db:
+        start_database()
+    if not args.skip_migrations:
+        migrate()
+    server = None if args.url else start_server(args.port, args.workers)
+    base_url = args.url or f"http://127.0.0.1:{args.port}"
+    run_id = uuid4().hex[:8]
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "base_url": base_url,
+            "workers": None if args.url else args.workers,
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+            "seed_tasks": args.tasks,
+            "seed_records": args.records,
+        },
+        "scenarios": {},
+    }
+    try:
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+            await wait_until_ready(client)
+            seeding = asyncio.Semaphore(8)
+
+            async def seed(index: int) -> VirtualUser:
+                async with seeding:
+                    return await seed_user(client, run_id, index, args.tasks, args.records)
+
+            users = await asyncio.gather(*(seed(index) for index in range(args.concurrency)))
+            for name in args.scenarios:
+                report["scenarios"][name] = await run_scenario(client, users, name, args.duration, run_id)
+                print(f"{name}: {report['scenarios'][name]['rps']} rps", file=sys.stderr)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+        if not args.keep_data:
+            await cleanup(run_id)
+
+    if args.baseline:
+        report["vs_baseline"] = compare(report, json.loads(Path(args.baseline).read_text()))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    print(output)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="End-to-end load test: uvicorn against local Postgres, httpx clients, JSON latency report."
+    )
+    parser.add_argument("--scenarios", type=lambda value: value.split(","), default=list(SCENARIOS),
+                        help=f"Comma separated, any of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=16, help="Virtual users, each with its own seeded board.")
+    parser.add_argument("--duration", type=float, default=15, help="Seconds per scenario.")
+    parser.add_argument("--tasks", type=int, default=200, help="Tasks seeded per virtual user's board.")
+    parser.add_argument("--records", type=int, default=2000, help="Records seeded per virtual user's workspace.")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers when the harness starts the server.")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--url", help="Target an already running server instead of starting one.")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--start-db", action="store_true", help="docker compose up the db service first.")
+    parser.add_argument("--skip-migrations", action="store_true")
+    parser.add_argument("--keep-data", action="store_true", help="Leave the seeded users and workspaces in place.")
+    parser.add_argument("--output", help="Also write the JSON report to this file.")
+    parser.add_argument("--baseline", help="A previous report to compare against.")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+    asyncio.run(main(args))
@@ -0,0 +1,95 @@
+import argparse
+import asyncio
+import json
+import os
+from time import perf_counter
+from uuid import uuid4
+
+# Logins are the load here; the per-client limiter would turn most of them into 429s.
+os.environ.setdefault("OCTOPIS_AUTH_RATE_LIMIT_ENABLED", "false")
+
+import httpx
+from sqlalchemy import delete
+
+from app import models
+from app.core import security
+from app.core.config import settings
+from app.db.session import SessionLocal, engine
+from app.main import app
+
+PASSWORD = "benchmark-password"
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))], 2)
+
+
+async def login_loop(client: httpx.AsyncClient, email: str, stop: asyncio.Event, outcomes: dict) -> None:
+    while not stop.is_set():
+        response = await client.post("/auth/login", json={"email": email, "password": PASSWORD})
+        outcomes[response.status_code] = outcomes.get(response.status_code, 0) + 1
+
+
+async def probe_loop(client: httpx.AsyncClient, token: str, stop: asyncio.Event, timings: list[float]) -> None:
+    # A cheap authenticated read: its latency is dominated by time spent waiting for the event loop.
+    headers = {"Authorization": f"Bearer {token}"}
+    while not stop.is_set():
+        started = perf_counter()
+        await client.get("/auth/me", headers=headers)
+        timings.append((perf_counter() - started) * 1000)
+        await asyncio.sleep(0.005)
+
+
+async def measure(client: httpx.AsyncClient, email: str, token: str, logins: int, duration: float) -> dict:
+    stop = asyncio.Event()
+    timings: list[float] = []
+    outcomes: dict[int, int] = {}
+    tasks = [asyncio.create_task(login_loop(client, email, stop, outcomes)) for _ in range(logins)]
+    tasks.append(asyncio.create_task(probe_loop(client, token, stop, timings)))
+    await asyncio.sleep(duration)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return {
+        "concurrent_logins": logins,
+        "logins_per_s": round(sum(outcomes.values()) / duration, 1),
+        "login_statuses": {str(code): count for code, count in sorted(outcomes.items())},
+        "probe_requests": len(timings),
+        "probe_p50_ms": percentile(timings, 0.5),
+        "probe_p99_ms": percentile(timings, 0.99),
+    }
+
+
+async def main(levels: list[int], duration: float) -> None:
+    email = f"bench-{uuid4().hex[:12]}@example.com"
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        response = await client.post("/auth/register", json={"email": email, "password": PASSWORD})
+        response.raise_for_status()
+        user_id = response.json()["id"]
+        response = await client.post("/auth/login", json={"email": email, "password": PASSWORD})
+        token = response.json()["access_token"]
+
+        executor = security.password_executor
+        try:
+            report = {"bcrypt_rounds": settings.password_bcrypt_rounds, "workers": settings.password_hash_workers}
+            # "inline" is the previous behaviour: bcrypt runs on the event loop thread.
+            security.password_executor = None
+            report["inline"] = [await measure(client, email, token, level, duration) for level in levels]
+            security.password_executor = executor
+            report["pool"] = [await measure(client, email, token, level, duration) for level in levels]
+            print(json.dumps(report, indent=2))
+        finally:
+            security.password_executor = executor
+            async with SessionLocal() as db:
+                await db.execute(delete(models.User).where(models.User.id == user_id))
+                await db.commit()
+            await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure how concurrent logins affect latency of other requests.")
+    parser.add_argument("--logins", type=int, nargs="+", default=[0, 4, 16])
+    parser.add_argument("--duration", type=float, default=5.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.duration))
@@ -0,0 +1,141 @@
+import argparse
+import asyncio
+import json
+from time import perf_counter
+from uuid import uuid4
+
+from fastapi import Request
+from sqlalchemy import delete, insert
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app import models
+from app.core.rate_limit import AuthRateLimitMiddleware, RateLimiter
+from app.core.request_id import RequestIdMiddleware
+from app.core.security import create_access_token
+from app.db.session import SessionLocal, engine
+from app.main import app
+
+
+class LegacyRequestIdMiddleware(BaseHTTPMiddleware):
+    # The previous @app.middleware("http") request id hook.
+    async def dispatch(self, request: Request, call_next):
+        request_id = request.headers.get("x-request-id") or str(uuid4())
+        request.state.request_id = request_id
+        response = await call_next(request)
+        response.headers["x-request-id"] = request_id
+        return response
+
+
+class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+    # The previous BaseHTTPMiddleware wrapper; only its non-/auth/ pass-through matters here.
+    def __init__(self, app, *, limiter: RateLimiter):
+        super().__init__(app)
+        self.limiter = limiter
+
+    async def dispatch(self, request: Request, call_next):
+        return await call_next(request)
+
+
+def legacy_stack(current: list[Middleware]) -> list[Middleware]:
+    replacements = {RequestIdMiddleware: LegacyRequestIdMiddleware, AuthRateLimitMiddleware: LegacyRateLimitMiddleware}
+    return [
+        Middleware(replacements.get(middleware.cls, middleware.cls), *middleware.args, **middleware.kwargs)
+        for middleware in current
+    ]
+
+
+async def call(path: str, query: bytes, headers: list[tuple[bytes, bytes]]) -> int:
+    # Drives the ASGI app directly so the numbers are not dominated by an HTTP client.
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query,
+        "headers": headers,
+        "client": ("127.0.0.1", 50000),
+        "server": ("benchmark", 80),
+    }
+    status_code = 0
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+
+    await app(scope, receive, send)
+    return status_code
+
+
+async def measure(requests: int, path: str, query: bytes, headers) -> dict:
+    for _ in range(min(50, requests)):
+        await call(path, query, headers)
+    started = perf_counter()
+    for _ in range(requests):
+        status_code = await call(path, query, headers)
+    elapsed = perf_counter() - started
+    assert status_code == 200, status_code
+    return {"requests_per_s": round(requests / elapsed), "us_per_request": round(elapsed / requests * 1e6, 1)}
+
+
+async def create_board(task_count: int) -> tuple[int, int]:
+    async with SessionLocal() as db:
+        user = models.User(email=f"bench-{uuid4().hex[:12]}@example.com", hashed_password="-")
+        db.add(user)
+        await db.flush()
+        workspace = models.Workspace(user_id=user.id, name="middleware benchmark")
+        db.add(workspace)
+        await db.flush()
+        board = models.Board(workspace_id=workspace.id, name="middleware benchmark", type="kanban", config=["todo"])
+        db.add(board)
+        await db.flush()
+        await db.execute(
+            insert(models.Task),
+            [{"board_id": board.id, "title": f"task {i}", "status": "todo", "position": i} for i in range(task_count)],
+        )
+        await db.commit()
+        return user.id, board.id
+
+
+async def main(requests: int, task_count: int) -> None:
+    user_id, board_id = await create_board(task_count)
+    headers = [(b"authorization", f"Bearer {create_access_token(str(user_id))}".encode())]
+    targets = {
+        "healthz": ("/healthz", b"", []),
+        "list_tasks": ("/tasks/", f"board_id={board_id}".encode(), headers),
+    }
+    current = list(app.user_middleware)
+    report = {"requests": requests, "tasks": task_count}
+    try:
+        for name, stack in (("base_http_middleware", legacy_stack(current)), ("pure_asgi", current)):
+            app.user_middleware = stack
+            app.middleware_stack = None
+            report[name] = {target: await measure(requests, *args) for target, args in targets.items()}
+        for target in targets:
+            report[f"{target}_speedup"] = round(
+                report["pure_asgi"][target]["requests_per_s"] / report["base_http_middleware"][target]["requests_per_s"], 2
+            )
+        print(json.dumps(report, indent=2))
+    finally:
+        app.user_middleware = current
+        app.middleware_stack = None
+        async with SessionLocal() as db:
+            await db.execute(delete(models.User).where(models.User.id == user_id))
+            await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Requests/sec with BaseHTTPMiddleware versus pure ASGI middleware.")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--tasks", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.tasks))
@@ -0,0 +1,73 @@
+import argparse
+import json
+import tracemalloc
+from collections import defaultdict, deque
+from time import perf_counter
+
+from app.core.config import settings
+from app.core.rate_limit import GcraLimiter, rate_limit_key
+
+
+def flood_gcra(clients: int, checkpoints: list[int]) -> list[dict]:
+    limiter = GcraLimiter(
+        max_requests=settings.auth_rate_limit_requests,
+        window_seconds=settings.auth_rate_limit_window_seconds,
+        max_keys=settings.auth_rate_limit_max_keys,
+    )
+    return run(clients, checkpoints, lambda client, now: limiter.hit(rate_limit_key(client, "/auth/login"), now), limiter)
+
+
+def flood_deque(clients: int, checkpoints: list[int]) -> list[dict]:
+    # The previous limiter: one deque of timestamps per client:path key, never evicted.
+    events: dict[str, deque[float]] = defaultdict(deque)
+
+    def hit(client: str, now: float) -> None:
+        bucket = events[f"{client}:/auth/login"]
+        while bucket and bucket[0] <= now - settings.auth_rate_limit_window_seconds:
+            bucket.popleft()
+        if len(bucket) < settings.auth_rate_limit_requests:
+            bucket.append(now)
+
+    return run(clients, checkpoints, hit, events)
+
+
+def run(clients: int, checkpoints: list[int], hit, state) -> list[dict]:
+    # Every request comes from a new spoofed X-Forwarded-For address, all inside one window.
+    report = []
+    tracemalloc.start()
+    started = perf_counter()
+    for index in range(1, clients + 1):
+        hit(f"10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}-{index}", index / clients)
+        if index in checkpoints:
+            current, peak = tracemalloc.get_traced_memory()
+            report.append(
+                {
+                    "clients": index,
+                    "keys": len(state),
+                    "memory_mb": round(current / 2**20, 1),
+                    "peak_mb": round(peak / 2**20, 1),
+                    "us_per_request": round((perf_counter() - started) / index * 1e6, 2),
+                }
+            )
+    tracemalloc.stop()
+    return report
+
+
+def main(clients: int, legacy_clients: int) -> None:
+    checkpoints = sorted({clients // 10, clients // 4, clients // 2, clients})
+    legacy_checkpoints = sorted({legacy_clients // 4, legacy_clients // 2, legacy_clients})
+    report = {
+        "max_keys": settings.auth_rate_limit_max_keys,
+        "gcra": flood_gcra(clients, checkpoints),
+        "deque": flood_deque(legacy_clients, legacy_checkpoints) if legacy_clients else [],
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Memory of the auth rate limiter under a distinct-client flood.")
+    parser.add_argument("--clients", type=int, default=1_000_000)
+    # The old structure grows linearly; a smaller run is enough to show the slope.
+    parser.add_argument("--legacy-clients", type=int, default=200_000)
+    args = parser.parse_args()
+    main(args.clients, args.legacy_clients)
@@ -0,0 +1,92 @@
+import argparse
+import asyncio
+import json
+import statistics
+from time import perf_counter
+from uuid import uuid4
+
+from sqlalchemy import delete, insert, update
+
+from app import models, schemas
+from app.db.session import SessionLocal, engine
+from app.routers.boards import apply_task_reorder
+
+
+async def create_board(task_count: int) -> tuple[int, int, list[int]]:
+    async with SessionLocal() as db:
+        user = models.User(email=f"bench-{uuid4().hex[:12]}@example.com", hashed_password="-")
+        db.add(user)
+        await db.flush()
+        workspace = models.Workspace(user_id=user.id, name="reorder benchmark")
+        db.add(workspace)
+        await db.flush()
+        board = models.Board(workspace_id=workspace.id, name="reorder benchmark", type="kanban", config=["todo"])
+        db.add(board)
+        await db.flush()
+        result = await db.execute(
+            insert(models.Task).returning(models.Task.id),
+            [{"board_id": board.id, "title": f"task {i}", "status": "todo", "position": i} for i in range(task_count)],
+        )
+        task_ids = list(result.scalars().all())
+        await db.commit()
+        return user.id, board.id, task_ids
+
+
+async def reorder_loop(board_id: int, items: list[schemas.TaskReorderItem]) -> None:
+    # The per-item implementation this endpoint used before the batch statement.
+    async with SessionLocal() as db:
+        for item in items:
+            await db.execute(
+                update(models.Task)
+                .where(models.Task.id == item.task_id, models.Task.board_id == board_id)
+                .values(status=item.status, position=item.position)
+            )
+        await db.commit()
+
+
+async def reorder_batch(board_id: int, items: list[schemas.TaskReorderItem]) -> None:
+    async with SessionLocal() as db:
+        await apply_task_reorder(db, board_id, items)
+        await db.commit()
+
+
+async def measure(fn, board_id: int, task_ids: list[int], rounds: int) -> dict:
+    timings = []
+    for round_no in range(rounds):
+        order = task_ids[round_no % 2 :] + task_ids[: round_no % 2]
+        items = [schemas.TaskReorderItem(task_id=task_id, status="todo", position=i) for i, task_id in enumerate(order)]
+        started = perf_counter()
+        await fn(board_id, items)
+        timings.append((perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "mean_ms": round(statistics.fmean(timings), 2),
+        "p50_ms": round(timings[len(timings) // 2], 2),
+        "max_ms": round(timings[-1], 2),
+    }
+
+
+async def main(task_count: int, rounds: int) -> None:
+    user_id, board_id, task_ids = await create_board(task_count)
+    try:
+        report = {
+            "tasks": task_count,
+            "rounds": rounds,
+            "loop": await measure(reorder_loop, board_id, task_ids, rounds),
+            "batch": await measure(reorder_batch, board_id, task_ids, rounds),
+        }
+        report["speedup"] = round(report["loop"]["mean_ms"] / report["batch"]["mean_ms"], 1)
+        print(json.dumps(report, indent=2))
+    finally:
+        async with SessionLocal() as db:
+            await db.execute(delete(models.User).where(models.User.id == user_id))
+            await db.commit()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare per-item and single-statement task reordering.")
+    parser.add_argument("--tasks", type=int, default=500)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.tasks, args.rounds))
@@ -0,0 +1,54 @@
+"""index workspace records data
+
+Revision ID: 0003_records_data_index
+Revises: 0002_task_fields
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0003_records_data_index"
+down_revision = "0002_task_fields"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        DO $$
+        DECLARE
+          record_table TEXT;
+        BEGIN
+          FOR record_table IN
+            SELECT tablename FROM pg_tables
+            WHERE schemaname = current_schema() AND tablename ~ '^workspace_[0-9]+_records$'
+          LOOP
+            EXECUTE format(
+              'CREATE INDEX IF NOT EXISTS %I ON %I USING GIN (data jsonb_path_ops)',
+              record_table || '_data_idx',
+              record_table
+            );
+          END LOOP;
+        END
+        $$;
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute(
+        """
+        DO $$
+        DECLARE
+          record_table TEXT;
+        BEGIN
+          FOR record_table IN
+            SELECT tablename FROM pg_tables
+            WHERE schemaname = current_schema() AND tablename ~ '^workspace_[0-9]+_records$'
+          LOOP
+            EXECUTE format('DROP INDEX IF EXISTS %I', record_table || '_data_idx');
+          END LOOP;
+        END
+        $$;
+        """
+    )
@@ -0,0 +1,41 @@
+"""task listing indexes
+
+Revision ID: 0004_task_listing_indexes
+Revises: 0003_records_data_index
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0004_task_listing_indexes"
+down_revision = "0003_records_data_index"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("UPDATE tasks SET position = 0 WHERE position IS NULL;")
+    op.execute("ALTER TABLE tasks ALTER COLUMN position SET NOT NULL;")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_tasks_board_id_position ON tasks (board_id, position, id);")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_tasks_board_id_due_date ON tasks (board_id, due_date);")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_task_data_task_id_field_id ON task_data (task_id, custom_field_definition_id);"
+    )
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_task_data_custom_field_definition_id ON task_data (custom_field_definition_id);"
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_boards_workspace_id ON boards (workspace_id);")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_workspaces_user_id ON workspaces (user_id);")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_custom_field_definitions_workspace_id ON custom_field_definitions (workspace_id);"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_custom_field_definitions_workspace_id;")
+    op.execute("DROP INDEX IF EXISTS ix_workspaces_user_id;")
+    op.execute("DROP INDEX IF EXISTS ix_boards_workspace_id;")
+    op.execute("DROP INDEX IF EXISTS ix_task_data_custom_field_definition_id;")
+    op.execute("DROP INDEX IF EXISTS ix_task_data_task_id_field_id;")
+    op.execute("DROP INDEX IF EXISTS ix_tasks_board_id_due_date;")
+    op.execute("DROP INDEX IF EXISTS ix_tasks_board_id_position;")
+    op.execute("ALTER TABLE tasks ALTER COLUMN position DROP NOT NULL;")
@@ -0,0 +1,24 @@
+"""task rank keys
+
+Revision ID: 0005_task_rank
+Revises: 0004_task_listing_indexes
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0005_task_rank"
+down_revision = "0004_task_listing_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""ALTER TABLE tasks ADD COLUMN rank VARCHAR(255) COLLATE "C" NOT NULL DEFAULT '';""")
+    op.execute("DROP INDEX IF EXISTS ix_tasks_board_id_position;")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_tasks_board_order ON tasks (board_id, position, rank, id);")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_tasks_board_order;")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_tasks_board_id_position ON tasks (board_id, position, id);")
+    op.execute("ALTER TABLE tasks DROP COLUMN IF EXISTS rank;")
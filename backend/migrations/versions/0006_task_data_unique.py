@@ -0,0 +1,39 @@
+"""unique task data per field
+
+Revision ID: 0006_task_data_unique
+Revises: 0005_task_rank
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0006_task_data_unique"
+down_revision = "0005_task_rank"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Keep the most recent value when a field was stored more than once for a task.
+    op.execute(
+        """
+        DELETE FROM task_data AS older
+        USING task_data AS newer
+        WHERE older.task_id = newer.task_id
+          AND older.custom_field_definition_id = newer.custom_field_definition_id
+          AND older.id < newer.id;
+        """
+    )
+    op.execute(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_task_data_task_id_field_id
+          ON task_data (task_id, custom_field_definition_id);
+        """
+    )
+    op.execute("DROP INDEX IF EXISTS ix_task_data_task_id_field_id;")
+
+
+def downgrade() -> None:
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_task_data_task_id_field_id ON task_data (task_id, custom_field_definition_id);"
+    )
+    op.execute("DROP INDEX IF EXISTS uq_task_data_task_id_field_id;")
@@ -0,0 +1,35 @@
+"""store refresh tokens as sha256 digests
+
+Revision ID: 0007_refresh_token_hash
+Revises: 0006_task_data_unique
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0007_refresh_token_hash"
+down_revision = "0006_task_data_unique"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Tokens that are already past their expiry would only be hashed to be pruned.
+    op.execute("DELETE FROM refresh_tokens WHERE expires_at < (now() AT TIME ZONE 'utc');")
+    op.execute("ALTER TABLE refresh_tokens ADD COLUMN token_hash VARCHAR(64);")
+    op.execute("UPDATE refresh_tokens SET token_hash = encode(sha256(convert_to(token, 'UTF8')), 'hex');")
+    op.execute("ALTER TABLE refresh_tokens ALTER COLUMN token_hash SET NOT NULL;")
+    op.execute("ALTER TABLE refresh_tokens DROP COLUMN token;")
+    op.execute("ALTER TABLE refresh_tokens ADD CONSTRAINT refresh_tokens_token_hash_key UNIQUE (token_hash);")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_refresh_tokens_user_id_expires_at ON refresh_tokens (user_id, expires_at);"
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_refresh_tokens_expires_at ON refresh_tokens (expires_at);")
+
+
+def downgrade() -> None:
+    # Digests cannot be turned back into tokens: existing sessions have to log in again.
+    op.execute("DELETE FROM refresh_tokens;")
+    op.execute("DROP INDEX IF EXISTS ix_refresh_tokens_expires_at;")
+    op.execute("DROP INDEX IF EXISTS ix_refresh_tokens_user_id_expires_at;")
+    op.execute("ALTER TABLE refresh_tokens DROP COLUMN token_hash;")
+    op.execute("ALTER TABLE refresh_tokens ADD COLUMN token VARCHAR(512) UNIQUE NOT NULL;")
@@ -0,0 +1,31 @@
+"""shared rate limit buckets
+
+Revision ID: 0008_rate_limit_buckets
+Revises: 0007_refresh_token_hash
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0008_rate_limit_buckets"
+down_revision = "0007_refresh_token_hash"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # UNLOGGED: no WAL for a hot, disposable table; losing it on a crash only resets the limits.
+    op.execute(
+        """
+        CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_buckets (
+          key BYTEA PRIMARY KEY,
+          tat DOUBLE PRECISION NOT NULL,
+          updated_at DOUBLE PRECISION NOT NULL
+        );
+        """
+    )
+    op.execute("CREATE INDEX IF NOT EXISTS ix_rate_limit_buckets_tat ON rate_limit_buckets (tat);")
+    op.execute("CREATE INDEX IF NOT EXISTS ix_rate_limit_buckets_updated_at ON rate_limit_buckets (updated_at);")
+
+
+def downgrade() -> None:
+    op.execute("DROP TABLE IF EXISTS rate_limit_buckets;")
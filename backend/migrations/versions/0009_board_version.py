@@ -0,0 +1,20 @@
+"""board version for conditional reads
+
+Revision ID: 0009_board_version
+Revises: 0008_rate_limit_buckets
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0009_board_version"
+down_revision = "0008_rate_limit_buckets"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE boards ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 0;")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE boards DROP COLUMN IF EXISTS version;")
@@ -0,0 +1,20 @@
+"""refresh token rotation time for the concurrent refresh grace window
+
+Revision ID: 0010_refresh_token_rotated_at
+Revises: 0009_board_version
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0010_refresh_token_rotated_at"
+down_revision = "0009_board_version"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("ALTER TABLE refresh_tokens ADD COLUMN IF NOT EXISTS rotated_at TIMESTAMP;")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE refresh_tokens DROP COLUMN IF EXISTS rotated_at;")
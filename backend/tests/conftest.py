@@ -0,0 +1,68 @@
+import asyncio
+import os
+import uuid
+from contextlib import asynccontextmanager
+
+import pytest
+
+# Tests log in far more often than the auth rate limit allows; set before app settings are loaded.
+os.environ.setdefault("OCTOPIS_AUTH_RATE_LIMIT_ENABLED", "false")
+
+import httpx  # noqa: E402
+from sqlalchemy import text  # noqa: E402
+
+from app.db.session import engine  # noqa: E402
+
+
+def run(coroutine):
+    # Each test gets its own event loop; pooled connections belong to the loop that opened them.
+    async def wrapper():
+        try:
+            return await coroutine
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(wrapper())
+
+
+async def database_available() -> bool:
+    try:
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+        return True
+    except Exception:
+        return False
+
+
+@pytest.fixture(scope="session")
+def database():
+    # Tests that need Postgres take this fixture and are skipped when it is not reachable.
+    if not run(database_available()):
+        pytest.skip("database not available")
+
+
+@asynccontextmanager
+async def api_client(email: str | None = None):
+    # In-process client for app.main, logged in as a fresh user; the user and everything they created
+    # (including per-workspace record tables) are deleted on exit.
+    from app.main import app
+
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+    email = email or f"test-{uuid.uuid4().hex[:12]}@example.com"
+    response = await client.post("/auth/register", json={"email": email, "password": "password123"})
+    assert response.status_code == 200, response.text
+    user_id = response.json()["id"]
+    try:
+        response = await client.post("/auth/login", json={"email": email, "password": "password123"})
+        assert response.status_code == 200, response.text
+        client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+        yield client
+    finally:
+        await client.aclose()
+        async with engine.begin() as connection:
+            workspace_ids = (
+                await connection.execute(text("SELECT id FROM workspaces WHERE user_id = :id"), {"id": user_id})
+            ).scalars().all()
+            for workspace_id in workspace_ids:
+                await connection.execute(text(f"DROP TABLE IF EXISTS workspace_{workspace_id}_records"))
+            await connection.execute(text("DELETE FROM users WHERE id = :id"), {"id": user_id})
@@ -0,0 +1,120 @@
+import uuid
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.db.session import engine
+from conftest import api_client, run
+
+
+async def login(client, email: str) -> str:
+    response = await client.post("/auth/login", json={"email": email, "password": "password123"})
+    assert response.status_code == 200, response.text
+    return response.json()["refresh_token"]
+
+
+async def refresh(client, token: str):
+    return await client.post("/auth/refresh", json={"refresh_token": token})
+
+
+async def age_rotation(token: str, seconds: int) -> None:
+    async with engine.begin() as connection:
+        await connection.execute(
+            text(
+                "UPDATE refresh_tokens SET rotated_at = rotated_at - make_interval(secs => :seconds)"
+                " WHERE token_hash = encode(sha256(convert_to(:token, 'UTF8')), 'hex')"
+            ),
+            {"token": token, "seconds": seconds},
+        )
+
+
+def new_email() -> str:
+    return f"test-{uuid.uuid4().hex[:12]}@example.com"
+
+
+async def rotation_chain() -> None:
+    email = new_email()
+    async with api_client(email) as client:
+        first = await login(client, email)
+        response = await refresh(client, first)
+        assert response.status_code == 200
+        second = response.json()["refresh_token"]
+        assert second != first
+        response = await refresh(client, second)
+        assert response.status_code == 200
+        third = response.json()
+        assert third["refresh_token"] not in (first, second)
+        me = await client.get("/auth/me", headers={"Authorization": f"Bearer {third['access_token']}"})
+        assert me.status_code == 200 and me.json()["email"] == email
+
+
+def test_refresh_rotates_the_token(database):
+    run(rotation_chain())
+
+
+async def concurrent_refresh() -> None:
+    email = new_email()
+    async with api_client(email) as client:
+        shared = await login(client, email)
+        other_session = await login(client, email)
+        winner = await refresh(client, shared)
+        loser = await refresh(client, shared)
+        assert winner.status_code == loser.status_code == 200
+        assert loser.json()["refresh_token"] == winner.json()["refresh_token"]
+
+        # The grace is spent: a third presentation is reuse and ends every session.
+        assert (await refresh(client, shared)).status_code == 401
+        assert (await refresh(client, winner.json()["refresh_token"])).status_code == 401
+        assert (await refresh(client, other_session)).status_code == 401
+
+
+def test_racing_tabs_get_the_same_successor_once(database):
+    run(concurrent_refresh())
+
+
+async def reuse_after_grace() -> None:
+    email = new_email()
+    async with api_client(email) as client:
+        stolen = await login(client, email)
+        other_session = await login(client, email)
+        response = await refresh(client, stolen)
+        successor = response.json()["refresh_token"]
+        await age_rotation(stolen, settings.refresh_token_reuse_grace_seconds + 1)
+
+        assert (await refresh(client, stolen)).status_code == 401
+        assert (await refresh(client, successor)).status_code == 401
+        assert (await refresh(client, other_session)).status_code == 401
+
+
+def test_reuse_after_the_grace_window_revokes_every_session(database):
+    run(reuse_after_grace())
+
+
+async def grace_needs_a_live_successor() -> None:
+    email = new_email()
+    async with api_client(email) as client:
+        first = await login(client, email)
+        other_session = await login(client, email)
+        second = (await refresh(client, first)).json()["refresh_token"]
+        assert (await refresh(client, second)).status_code == 200
+        # The successor was already rotated itself: handing it out again would be useless.
+        assert (await refresh(client, first)).status_code == 401
+        assert (await refresh(client, other_session)).status_code == 401
+
+
+def test_grace_needs_an_unused_successor(database):
+    run(grace_needs_a_live_successor())
+
+
+async def unknown_tokens() -> None:
+    email = new_email()
+    async with api_client(email) as client:
+        session = await login(client, email)
+        assert (await refresh(client, "not-a-jwt")).status_code == 401
+        access = client.headers["Authorization"].removeprefix("Bearer ")
+        assert (await refresh(client, access)).status_code == 401
+        assert (await refresh(client, session)).status_code == 200
+
+
+def test_invalid_tokens_are_rejected_without_revoking(database):
+    run(unknown_tokens())
@@ -0,0 +1,101 @@
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.jsonb_filter import MAX_FILTER_CONDITIONS, compile_record_filter
+
+
+def compile_filter(spec) -> tuple[str, dict]:
+    sql, binds = compile_record_filter(json.dumps(spec))
+    return sql, {bind.key: bind.value for bind in binds}
+
+
+def assert_rejected(raw: str, message: str) -> None:
+    with pytest.raises(HTTPException) as error:
+        compile_record_filter(raw)
+    assert error.value.status_code == 400
+    assert message in error.value.detail
+
+
+def test_empty_filter_matches_everything():
+    assert compile_record_filter(None) == ("", [])
+    assert compile_record_filter("") == ("", [])
+
+
+def test_equalities_merge_into_one_containment():
+    sql, params = compile_filter({"status": "done", "owner.name": "ann", "owner.team": "core"})
+    assert sql == "data @> :f_contains"
+    assert params == {"f_contains": {"status": "done", "owner": {"name": "ann", "team": "core"}}}
+
+
+def test_contains_and_explicit_eq_share_the_containment():
+    sql, params = compile_filter({"tags": {"$contains": ["a"]}, "status": {"$eq": "open"}})
+    assert sql == "data @> :f_contains"
+    assert params == {"f_contains": {"tags": ["a"], "status": "open"}}
+
+
+def test_in_becomes_or_of_containments():
+    sql, params = compile_filter({"owner.name": {"$in": ["ann", "bob"]}})
+    assert sql == "(data @> :f0_0 OR data @> :f0_1)"
+    assert params == {"f0_0": {"owner": {"name": "ann"}}, "f0_1": {"owner": {"name": "bob"}}}
+
+
+def test_numeric_range_only_compares_json_numbers():
+    sql, params = compile_filter({"amount": {"$gte": 10, "$lt": 100}})
+    assert sql == (
+        "(CASE WHEN jsonb_typeof(data #> :f0_path) = 'number' THEN (data #>> :f0_path)::numeric END) >= :f0"
+        " AND "
+        "(CASE WHEN jsonb_typeof(data #> :f2_path) = 'number' THEN (data #>> :f2_path)::numeric END) < :f2"
+    )
+    assert params == {"f0_path": ["amount"], "f0": 10, "f2_path": ["amount"], "f2": 100}
+
+
+def test_string_range_compares_text():
+    sql, params = compile_filter({"owner.name": {"$gt": "b"}, "owner.since": {"$lte": "2024"}})
+    assert sql == "(data #>> :f0_path) > :f0 AND (data #>> :f2_path) <= :f2"
+    assert params == {"f0_path": ["owner", "name"], "f0": "b", "f2_path": ["owner", "since"], "f2": "2024"}
+
+
+def test_containment_comes_first():
+    sql, params = compile_filter({"amount": {"$gt": 1}, "status": "open"})
+    assert sql.startswith("data @> :f_contains AND ")
+    assert params["f_contains"] == {"status": "open"}
+
+
+def test_values_are_bound_never_inlined():
+    sql, _ = compile_filter({"status": "x' OR 1=1 --", "name": {"$gt": "'; DROP TABLE users; --"}})
+    assert "DROP" not in sql and "OR 1=1" not in sql
+
+
+@pytest.mark.parametrize(
+    ("raw", "message"),
+    [
+        ("not json", "Filter must be a JSON object"),
+        ("[1, 2]", "Filter must be a JSON object"),
+        ('{"": 1}', "Filter keys must not be empty"),
+        ('{"...": 1}', "Filter keys must not be empty"),
+        ('{"status": {"$regex": "a"}}', "Unsupported operator $regex"),
+        ('{"status": {"$in": []}}', "$in expects a non-empty list"),
+        ('{"status": {"$in": "a"}}', "$in expects a non-empty list"),
+        ('{"amount": {"$gt": [1]}}', "$gt expects a number or a string"),
+        ('{"amount": {"$lte": {"a": 1}}}', "$lte expects a number or a string"),
+        ('{"amount": {"$gte": true}}', "$gte expects a number or a string"),
+        ('{"amount": {"$lt": null}}', "$lt expects a number or a string"),
+        ('{"owner.name": "ann", "owner": {"$eq": {"name": "bob"}}}', "Conflicting conditions for key name"),
+    ],
+)
+def test_invalid_filters_are_rejected(raw, message):
+    assert_rejected(raw, message)
+
+
+def test_condition_cap():
+    at_cap = {f"k{index}": index for index in range(MAX_FILTER_CONDITIONS)}
+    compile_filter(at_cap)
+    over_cap = {**at_cap, "extra": {"$gt": 1}}
+    assert_rejected(json.dumps(over_cap), f"At most {MAX_FILTER_CONDITIONS} conditions are allowed")
+    # Operators inside one key count separately.
+    assert_rejected(
+        json.dumps({"amount": {"$in": [1], "$gt": 1, "$lt": 2}, **{f"k{i}": i for i in range(18)}}),
+        "At most",
+    )
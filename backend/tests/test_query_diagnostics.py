@@ -0,0 +1,81 @@
+import pytest
+
+from app.core.authz import board_owners, workspace_owners
+from app.core.deps import user_cache
+from app.core.query_diagnostics import QueryLog, assert_max_queries, fingerprint
+from conftest import api_client, run
+
+
+@pytest.mark.parametrize(
+    ("statement", "expected"),
+    [
+        ("SELECT a FROM t WHERE id = $1 AND b = $12", "SELECT a FROM t WHERE id = ? AND b = ?"),
+        ("SELECT a FROM t WHERE s = 'x''y' AND n > 10 AND f < 2.5", "SELECT a FROM t WHERE s = ? AND n > ? AND f < ?"),
+        ("SELECT a FROM t WHERE id IN ($1, $2, $3)", "SELECT a FROM t WHERE id IN (?, ...)"),
+        ("SELECT a FROM t WHERE id in (1,2)", "SELECT a FROM t WHERE id in (?, ...)"),
+        ("INSERT INTO t (a, b) VALUES ($1, $2), ($3, $4), ($5, $6)", "INSERT INTO t (a, b) VALUES (?, ?), ..."),
+        ("SELECT pg_notify($1, $2)", "SELECT pg_notify(?, ?)"),
+        ("SELECT col1\n  FROM   t2", "SELECT col1 FROM t2"),
+    ],
+)
+def test_fingerprint_strips_literals(statement, expected):
+    assert fingerprint(statement) == expected
+
+
+def test_fingerprint_collapses_list_lengths():
+    assert fingerprint("SELECT a FROM t WHERE id IN ($1, $2)") == fingerprint("SELECT a FROM t WHERE id IN (5, 6, 7)")
+
+
+def test_query_log_reports_repeated_shapes():
+    log = QueryLog()
+    log.queries = [(f"SELECT a FROM t WHERE id = ${index}", 0.001) for index in range(1, 4)]
+    log.queries.append(("SELECT b FROM u", 0.001))
+    assert log.repeated(3) == [("SELECT a FROM t WHERE id = ?", 3)]
+
+
+def test_assert_max_queries_fails_with_the_query_list():
+    with pytest.raises(AssertionError, match="2 statements executed, expected at most 1"):
+        with assert_max_queries(1) as log:
+            log.queries += [("SELECT 1", 0.0), ("SELECT 2", 0.0)]
+
+
+async def board_reads(task_count: int) -> None:
+    async with api_client() as client:
+        workspace = (await client.post("/workspaces/", json={"name": "queries"})).json()
+        board = (
+            await client.post("/boards/", json={"workspace_id": workspace["id"], "name": "queries", "type": "kanban"})
+        ).json()
+        fields = [
+            (await client.post(f"/workspaces/{workspace['id']}/fields", json={"name": name, "field_type": "text"})).json()
+            for name in ("owner", "area")
+        ]
+        for index in range(task_count):
+            response = await client.post(
+                "/tasks/",
+                json={
+                    "board_id": board["id"],
+                    "title": f"task {index}",
+                    "custom_fields": {str(field["id"]): f"value {index}" for field in fields},
+                },
+            )
+            assert response.status_code == 200, response.text
+
+        # Cold caches: the user and ownership lookups are part of the budget.
+        for cache in (user_cache, board_owners, workspace_owners):
+            cache.clear()
+        # user, board ownership, board version, tasks, custom field values
+        with assert_max_queries(5):
+            response = await client.get(f"/tasks/?board_id={board['id']}")
+        assert response.status_code == 200
+        assert len(response.json()) == task_count
+        assert all(len(task["custom_fields"]) == 2 for task in response.json())
+
+        # ownership is cached by now; version and the whole board come from one statement
+        with assert_max_queries(2):
+            response = await client.get(f"/boards/{board['id']}/snapshot")
+        assert response.status_code == 200
+        assert len(response.json()["tasks"]) == task_count
+
+
+def test_board_reads_do_not_scale_with_task_count(database):
+    run(board_reads(20))
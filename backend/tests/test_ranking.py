@@ -0,0 +1,86 @@
+import uuid
+
+import pytest
+from sqlalchemy import select
+
+from app import models
+from app.core.ranking import RankConflict, rank_between, resolve_placement
+from app.db.session import SessionLocal
+from conftest import run
+
+
+def test_rank_between_orders_keys():
+    assert "" < rank_between(None, None)
+    assert "V" < rank_between("V", None)
+    assert rank_between(None, "V") < "V"
+    assert "V" < rank_between("V", "W") < "W"
+    with pytest.raises(RankConflict):
+        rank_between("V", "V")
+
+
+async def place_tasks() -> list[str]:
+    async with SessionLocal() as db:
+        user = models.User(email=f"ranking-{uuid.uuid4().hex[:8]}@example.com", hashed_password="x")
+        db.add(user)
+        await db.flush()
+        workspace = models.Workspace(user_id=user.id, name="ranking")
+        db.add(workspace)
+        await db.flush()
+        board = models.Board(workspace_id=workspace.id, name="ranking", type="kanban")
+        db.add(board)
+        await db.flush()
+
+        async def add(title: str, after: int | None = None, before: int | None = None) -> int:
+            position, rank = 5, ""
+            if after is not None or before is not None:
+                position, rank = await resolve_placement(db, board.id, after, before)
+            task = models.Task(board_id=board.id, title=title, position=position, rank=rank)
+            db.add(task)
+            await db.flush()
+            return task.id
+
+        try:
+            a = await add("A")
+            for title in ("X1", "X2", "X3"):
+                await add(title, after=a)
+            last = (
+                await db.execute(
+                    select(models.Task.id)
+                    .where(models.Task.board_id == board.id)
+                    .order_by(models.Task.position.desc(), models.Task.rank.desc(), models.Task.id.desc())
+                    .limit(1)
+                )
+            ).scalar_one()
+            for title in ("Y1", "Y2", "Y3"):
+                await add(title, before=last)
+
+            # Moving an existing task ignores its own key.
+            tasks = {
+                task.title: task
+                for task in (await db.execute(select(models.Task).where(models.Task.board_id == board.id))).scalars()
+            }
+            x3 = tasks["X3"]
+            x3.position, x3.rank = await resolve_placement(db, board.id, a, None, x3.id)
+            x2 = tasks["X2"].id
+            x3.position, x3.rank = await resolve_placement(db, board.id, x2, None, x3.id)
+            await db.flush()
+
+            rows = await db.execute(
+                select(models.Task.title, models.Task.rank)
+                .where(models.Task.board_id == board.id)
+                .order_by(models.Task.position, models.Task.rank, models.Task.id)
+            )
+            ordered = [(title, rank) for title, rank in rows]
+        finally:
+            # Nothing is committed: the user, board and tasks disappear with the transaction.
+            await db.rollback()
+    return ordered
+
+
+def test_repeated_placements_land_next_to_the_neighbour(database):
+    ordered = run(place_tasks())
+    assert [title for title, _ in ordered] == ["A", "X2", "X3", "Y1", "Y2", "Y3", "X1"]
+    ranks = [rank for _, rank in ordered]
+    # Every placement fitted between existing keys: no rebalance, A keeps the lowest key.
+    assert ranks[0] == ""
+    assert ranks == sorted(set(ranks))
@@ -0,0 +1,65 @@
+import asyncio
+import uuid
+from multiprocessing import resource_tracker, shared_memory
+
+import pytest
+
+from app.core.rate_limit import SharedMemoryLimiter, rate_limit_key
+
+
+def limiter(name: str, slots: int = 64) -> SharedMemoryLimiter:
+    return SharedMemoryLimiter(max_requests=2, window_seconds=60, slots=slots, name=name)
+
+
+@pytest.fixture
+def segment_name():
+    name = f"octopis_test_{uuid.uuid4().hex[:12]}"
+    yield name
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return
+    shm.close()
+    shm.unlink()
+
+
+def test_workers_share_one_table(segment_name):
+    first, second = limiter(segment_name), limiter(segment_name)
+    assert first.owner and not second.owner
+    key = rate_limit_key("10.0.0.1", "/auth/login")
+    assert first.hit(key, 1000.0) == 0
+    assert second.hit(key, 1000.0) == 0
+    assert first.hit(key, 1000.0) > 0
+    assert second.hit(rate_limit_key("10.0.0.2", "/auth/login"), 1000.0) == 0
+    asyncio.run(second.stop())
+    asyncio.run(first.stop())
+
+
+def test_owner_unlinks_on_stop(segment_name):
+    owner, attached = limiter(segment_name), limiter(segment_name)
+    asyncio.run(attached.stop())
+    shared_memory.SharedMemory(name=segment_name).close()
+    asyncio.run(owner.stop())
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=segment_name)
+    # The next worker starts a fresh table and owns it.
+    replacement = limiter(segment_name)
+    assert replacement.owner
+    asyncio.run(replacement.stop())
+
+
+def test_slot_count_mismatch_is_rejected(segment_name):
+    owner = limiter(segment_name, slots=64)
+    with pytest.raises(RuntimeError, match="holds 64 rate limit slots, 128 configured"):
+        limiter(segment_name, slots=128)
+    asyncio.run(owner.stop())
+
+
+def test_foreign_segment_is_rejected(segment_name, monkeypatch):
+    foreign = shared_memory.SharedMemory(name=segment_name, create=True, size=4096)
+    resource_tracker.unregister(foreign._name, "shared_memory")
+    foreign.buf[:8] = b"notours!"
+    monkeypatch.setattr(SharedMemoryLimiter, "OPEN_ATTEMPTS", 3)
+    with pytest.raises(RuntimeError, match="is not a rate limit table"):
+        limiter(segment_name)
+    foreign.close()
@@ -0,0 +1,94 @@
+import asyncio
+import json
+
+import pytest
+
+from app.core.records_io import RecordImportError, iter_import_rows
+
+
+def parse(payload: bytes, fmt: str, chunk_size: int | None = None) -> list[tuple[int, dict]]:
+    async def chunks():
+        size = chunk_size or len(payload) or 1
+        for start in range(0, len(payload), size):
+            yield payload[start : start + size]
+
+    async def collect():
+        return [(line, json.loads(data)) async for line, data in iter_import_rows(chunks(), fmt)]
+
+    return asyncio.run(collect())
+
+
+def parse_error(payload: bytes, fmt: str) -> RecordImportError:
+    with pytest.raises(RecordImportError) as error:
+        parse(payload, fmt)
+    return error.value
+
+
+def test_ndjson_unwraps_only_the_exact_export_envelope():
+    payload = b"\n".join(
+        [
+            b'{"id": 7, "data": {"a": 1}, "created_at": "2024-01-01T00:00:00"}',
+            b'{"data": {"a": 2}}',
+            b'{"id": 1, "data": {"a": 3}}',
+            b'{"id": 1, "data": {"a": 4}, "created_at": null, "extra": true}',
+            b'{"id": 1, "data": "text", "created_at": null}',
+        ]
+    )
+    assert parse(payload, "ndjson") == [
+        (1, {"a": 1}),
+        (2, {"data": {"a": 2}}),
+        (3, {"id": 1, "data": {"a": 3}}),
+        (4, {"id": 1, "data": {"a": 4}, "created_at": None, "extra": True}),
+        (5, {"id": 1, "data": "text", "created_at": None}),
+    ]
+
+
+def test_ndjson_skips_blank_lines_and_survives_chunk_boundaries():
+    payload = '\ufeff{"name": "ёж"}\n\n   \n{"name": "b"}'.encode("utf-8")
+    assert parse(payload, "ndjson", chunk_size=3) == [(1, {"name": "ёж"}), (4, {"name": "b"})]
+
+
+@pytest.mark.parametrize("constant", [b"NaN", b"Infinity", b"-Infinity"])
+def test_ndjson_rejects_non_finite_numbers(constant):
+    error = parse_error(b'{"a": 1}\n{"a": ' + constant + b"}\n", "ndjson")
+    assert error.line == 2
+
+
+@pytest.mark.parametrize(("payload", "line"), [(b'{"a": 1}\n{"a": \n', 2), (b'{"a": 1}\n[1, 2]\n', 2)])
+def test_ndjson_reports_the_bad_line(payload, line):
+    assert parse_error(payload, "ndjson").line == line
+
+
+def test_csv_with_export_header_unwraps_data():
+    payload = b'id,data,created_at\n1,"{""a"": 1}",2024-01-01\n'
+    assert parse(payload, "csv") == [(2, {"a": 1})]
+
+
+def test_csv_with_other_header_keeps_columns():
+    payload = b'id,data\n1,"{""a"": 1}"\n'
+    assert parse(payload, "csv") == [(2, {"id": "1", "data": '{"a": 1}'})]
+
+
+def test_csv_quoted_field_spans_lines():
+    payload = b'title,notes\nfirst,"line one\nline two, with comma"\nsecond,plain\n'
+    assert parse(payload, "csv", chunk_size=5) == [
+        (3, {"title": "first", "notes": "line one\nline two, with comma"}),
+        (4, {"title": "second", "notes": "plain"}),
+    ]
+
+
+def test_csv_envelope_rejects_non_finite_numbers():
+    error = parse_error(b'id,data,created_at\n1,"{""a"": NaN}",\n', "csv")
+    assert error.line == 2
+
+
+@pytest.mark.parametrize(
+    ("payload", "line"),
+    [
+        (b"a,b\n1,2,3\n", 2),
+        (b'a,b\n1,"open\n', 2),
+        (b'id,data,created_at\n1,"[1]",\n', 2),
+    ],
+)
+def test_csv_reports_the_bad_line(payload, line):
+    assert parse_error(payload, "csv").line == line
@@ -0,0 +1,109 @@
+import math
+from contextlib import asynccontextmanager
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import deps
+from app.db.replica import read_after_lsn, replica_monitor
+from app.db.session import engine
+from conftest import api_client, run
+
+
+@asynccontextmanager
+async def stale_replica():
+    # A session pinned to a REPEATABLE READ snapshot taken now behaves like a replica that has not
+    # replayed anything committed afterwards.
+    async with AsyncSession(bind=engine) as session:
+        await session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+        await session.execute(text("SELECT 1"))
+
+        @asynccontextmanager
+        async def replica_session():
+            yield session
+
+        yield replica_session
+
+
+@pytest.fixture
+def replica_in_rotation(monkeypatch):
+    # Stands in for a configured, healthy replica; tests pick the replayed position.
+    monkeypatch.setattr(replica_monitor, "engine", engine)
+    monkeypatch.setattr(replica_monitor, "healthy", True)
+    monkeypatch.setattr(replica_monitor, "replayed_lsn", 0)
+
+
+async def event_refetch(monkeypatch) -> None:
+    async with api_client() as client:
+        workspace = (await client.post("/workspaces/", json={"name": "replica"})).json()
+        board = (
+            await client.post("/boards/", json={"workspace_id": workspace["id"], "name": "replica", "type": "kanban"})
+        ).json()
+        await client.post("/tasks/", json={"board_id": board["id"], "title": "before"})
+
+        async with stale_replica() as replica_session:
+            # Another user's write: the board event carries the new version, the replica lags behind it.
+            created = await client.post("/tasks/", json={"board_id": board["id"], "title": "after"})
+            async with engine.connect() as connection:
+                version = (
+                    await connection.execute(text("SELECT version FROM boards WHERE id = :id"), {"id": board["id"]})
+                ).scalar_one()
+            monkeypatch.setattr(deps, "ReplicaSessionLocal", replica_session)
+
+            tasks_url = f"/tasks/?board_id={board['id']}"
+            stale = await client.get(tasks_url)
+            assert [task["title"] for task in stale.json()] == ["before"]
+
+            fresh = await client.get(f"{tasks_url}&min_version={version}")
+            assert [task["title"] for task in fresh.json()] == ["before", "after"]
+            # The tag describes what was read, and min_version does not split the validator.
+            stale_tag = f'"tasks-{board["id"]}-{version - 1}-'
+            assert stale.headers["ETag"].startswith(stale_tag)
+            assert fresh.headers["ETag"] == stale.headers["ETag"].replace(stale_tag, f'"tasks-{board["id"]}-{version}-')
+
+            snapshot = await client.get(f"/boards/{board['id']}/snapshot?min_version={version}")
+            assert [task["title"] for task in snapshot.json()["tasks"]] == ["before", "after"]
+            assert snapshot.headers["ETag"] == f'"snapshot-{board["id"]}-{version}"'
+            assert created.json()["id"] == snapshot.json()["tasks"][-1]["id"]
+
+
+def test_event_refetch_reads_past_a_stale_replica(database, replica_in_rotation, monkeypatch):
+    run(event_refetch(monkeypatch))
+
+
+async def own_write_read(monkeypatch) -> None:
+    async with api_client() as client:
+        workspace = (await client.post("/workspaces/", json={"name": "replica"})).json()
+        board = (
+            await client.post("/boards/", json={"workspace_id": workspace["id"], "name": "replica", "type": "kanban"})
+        ).json()
+        tasks_url = f"/tasks/?board_id={board['id']}"
+        assert "X-Write-Lsn" not in (await client.get(tasks_url)).headers
+
+        async with stale_replica() as replica_session:
+            created = await client.post("/tasks/", json={"board_id": board["id"], "title": "mine"})
+            lsn = int(created.headers["X-Write-Lsn"])
+            monkeypatch.setattr(deps, "ReplicaSessionLocal", replica_session)
+
+            # Served by any worker: the marker comes with the request, not from worker memory.
+            monkeypatch.setattr(replica_monitor, "replayed_lsn", lsn - 1)
+            response = await client.get(tasks_url, headers={"X-Min-Lsn": str(lsn)})
+            assert [task["title"] for task in response.json()] == ["mine"]
+            response = await client.get(tasks_url, headers={"X-Min-Lsn": "garbage"})
+            assert [task["title"] for task in response.json()] == ["mine"]
+
+            # Without the marker, or once the replica has replayed it, reads go to the replica.
+            assert (await client.get(tasks_url)).json() == []
+            monkeypatch.setattr(replica_monitor, "replayed_lsn", lsn)
+            assert (await client.get(tasks_url, headers={"X-Min-Lsn": str(lsn)})).json() == []
+
+
+def test_clients_read_their_own_writes_past_a_lagging_replica(database, replica_in_rotation, monkeypatch):
+    run(own_write_read(monkeypatch))
+
+
+def test_read_after_lsn():
+    assert read_after_lsn(None) is None
+    assert read_after_lsn("123") == 123
+    assert read_after_lsn("0/16B3748") == math.inf
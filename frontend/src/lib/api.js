@@ -11,6 +11,8 @@ const api = axios.create({
 
 api.interceptors.request.use((config) => {
   const { accessToken } = store.getState().auth;
+  const writeLsn = localStorage.getItem("writeLsn");
+  if (writeLsn) config.headers["X-Min-Lsn"] = writeLsn;
   if (accessToken) {
     config.headers.Authorization = `Bearer ${accessToken}`;
 
@@ -21,6 +23,14 @@ api.interceptors.request.use((config) => {
 
 });
 
+export const boardEventsUrl = (boardId) => {
+  // The WebSocket handshake cannot carry an Authorization header, so the token goes in the query.
+  const url = new URL(`${api.defaults.baseURL.replace(/\/$/, "")}/boards/${boardId}/events`, window.location.href);
+  url.protocol = url.protocol === "https:" ? "wss:" : "ws:";
+  url.searchParams.set("token", store.getState().auth.accessToken || "");
+  return url.toString();
+};
+
 let isRefreshing = false;
 let pending = [];
 const MAX_RETRY_ATTEMPTS = Number(import.meta.env.VITE_API_RETRY_MAX_ATTEMPTS || 2);
@@ -39,6 +49,24 @@ const resetAuthSession = () => {
   }
 };
 
+// Tabs share the tokens in localStorage, and the server treats a rotated refresh token coming back as
+// theft. Refresh under a cross-tab lock, and adopt the tokens another tab stored instead of refreshing
+// with the one it already rotated.
+const refreshTokens = async (refreshToken) => {
+  const rotate = async () => {
+    const stored = localStorage.getItem("refreshToken");
+    if (stored && stored !== refreshToken) {
+      return { access_token: localStorage.getItem("accessToken"), refresh_token: stored };
+    }
+    const res = await api.post("/auth/refresh", { refresh_token: refreshToken });
+    return res.data;
+  };
+  if (typeof navigator !== "undefined" && navigator.locks) {
+    return navigator.locks.request("octopis-auth-refresh", rotate);
+  }
+  return rotate();
+};
+
 const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
 
 const shouldRetryRequest = (error, config) => {
@@ -54,8 +82,20 @@ const shouldRetryRequest = (error, config) => {
 };
 
 
+// After a write the API returns the primary's WAL position; sending the latest one back keeps this
+// browser's reads off a read replica that has not replayed its own writes yet. Shared by all tabs.
+const rememberWriteLsn = (response) => {
+  const lsn = response.headers?.["x-write-lsn"];
+  if (!lsn) return;
+  const current = localStorage.getItem("writeLsn");
+  if (!current || BigInt(lsn) > BigInt(current)) localStorage.setItem("writeLsn", lsn);
+};
+
 api.interceptors.response.use(
-  (response) => response,
+  (response) => {
+    rememberWriteLsn(response);
+    return response;
+  },
   async (error) => {
     const original = error?.config;
     if (!original) return Promise.reject(error);
@@ -234,7 +274,7 @@ api.interceptors.response.use(
 
 
 
-        const res = await api.post("/auth/refresh", { refresh_token: refreshToken });
+        const tokens = await refreshTokens(refreshToken);
 
 
 
@@ -247,7 +287,7 @@ api.interceptors.response.use(
 
 
 
-        store.dispatch(setTokens(res.data));
+        store.dispatch(setTokens(tokens));
 
 
 
@@ -260,7 +300,7 @@ api.interceptors.response.use(
 
 
 
-        pending.forEach((p) => p.resolve(res.data.access_token));
+        pending.forEach((p) => p.resolve(tokens.access_token));
 
 
 
@@ -287,7 +327,7 @@ api.interceptors.response.use(
 
 
         original.headers = original.headers || {};
-        original.headers.Authorization = `Bearer ${res.data.access_token}`;
+        original.headers.Authorization = `Bearer ${tokens.access_token}`;
         return api(original);
 
 
@@ -1,6 +1,6 @@
 import { useEffect, useMemo, useState } from "react";
 import { useNavigate, useParams } from "react-router-dom";
-import api from "../lib/api.js";
+import api, { boardEventsUrl } from "../lib/api.js";
 import KanbanBoard from "../components/KanbanBoard.jsx";
 import useModalBodyClass from "../hooks/useModalBodyClass.js";
 import styles from "./BoardView.module.css";
@@ -49,23 +49,23 @@ export default function BoardView() {
   const loadInitial = async () => {
     setLoading(true);
     try {
-      const [tasksRes, boardRes] = await Promise.all([
-        api.get(`/tasks/?board_id=${boardId}`),
-        api.get(`/boards/${boardId}/meta`)
-      ]);
-      setTasks(tasksRes.data);
-      setBoard(boardRes.data);
-      if (boardRes.data?.config?.length) {
-        setNewStatus(boardRes.data.config[0]);
+      const res = await api.get(`/boards/${boardId}/snapshot`);
+      setTasks(res.data.tasks);
+      setBoard(res.data.board);
+      if (res.data.board?.config?.length) {
+        setNewStatus(res.data.board.config[0]);
       }
     } finally {
       setLoading(false);
     }
   };
 
-  const refreshTasks = async () => {
+  // minVersion comes from a board event: the server then reads from the primary if the replica
+  // has not caught up with the change yet.
+  const refreshTasks = async (minVersion) => {
     try {
-      const tasksRes = await api.get(`/tasks/?board_id=${boardId}`);
+      const since = Number.isInteger(minVersion) ? `&min_version=${minVersion}` : "";
+      const tasksRes = await api.get(`/tasks/?board_id=${boardId}${since}`);
       setTasks(tasksRes.data);
     } catch {
       // ignore background refresh errors
@@ -74,8 +74,37 @@ export default function BoardView() {
 
   useEffect(() => {
     loadInitial();
-    const timer = setInterval(refreshTasks, 8000);
-    return () => clearInterval(timer);
+    // Changes made by others arrive over the board event socket; polling only runs while it is down.
+    let socket = null;
+    let timer = null;
+    let reconnect = null;
+    let connectedBefore = false;
+    let closed = false;
+    const connect = () => {
+      socket = new WebSocket(boardEventsUrl(boardId));
+      socket.onopen = () => {
+        clearInterval(timer);
+        timer = null;
+        if (connectedBefore) refreshTasks();
+        connectedBefore = true;
+      };
+      socket.onmessage = (event) => {
+        const message = JSON.parse(event.data);
+        if (message.event !== "ping") refreshTasks(message.version);
+      };
+      socket.onclose = () => {
+        if (closed) return;
+        if (!timer) timer = setInterval(() => refreshTasks(), 8000);
+        reconnect = setTimeout(connect, 5000);
+      };
+    };
+    connect();
+    return () => {
+      closed = true;
+      clearInterval(timer);
+      clearTimeout(reconnect);
+      socket?.close();
+    };
   }, [boardId]);
 
   useEffect(() => {